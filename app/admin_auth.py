@@ -1,7 +1,6 @@
 import os
 import hashlib
 import secrets
-from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from fastapi import Request, HTTPException
 
@@ -24,6 +23,7 @@ def verify_password(plain_password: str) -> bool:
 
 def create_access_token(data: dict) -> str:
     """Create JWT token for admin session"""
+    from jose import jwt
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
@@ -31,6 +31,7 @@ def create_access_token(data: dict) -> str:
 
 def verify_admin_token(token: str) -> bool:
     """Verify JWT token"""
+    from jose import JWTError, jwt
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         return payload.get("admin") == True
@@ -0,0 +1,70 @@
+"""
+Facets - Active-post counts per tag and nationality for the sidebar.
+facet_counts is a rollup kept in step by the write paths (create, block,
+unblock, bulk moderation) in the same transaction as the post change, so the
+sidebar reads a few dozen rows instead of a GROUP BY over posts.
+"""
+from collections import Counter
+from typing import Iterable, Optional, Sequence, Tuple
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert
+from .models import FacetCount
+
+FACETS = ("tag", "nationality")
+SIDEBAR_LIMIT = 12
+
+# Full recount, for migrations and bulk loads. A post counts once per tag
+# even if it repeats one, the same as facet_deltas
+REBUILD = """
+    WITH active AS (SELECT id, tags, nationality FROM posts WHERE status = 'active')
+    INSERT INTO facet_counts (facet, value, count)
+    SELECT 'tag', tag, COUNT(DISTINCT id) FROM active, unnest(tags) AS tag GROUP BY tag
+    UNION ALL
+    SELECT 'nationality', nationality, COUNT(*) FROM active WHERE nationality IS NOT NULL GROUP BY nationality
+"""
+
+
+def facet_deltas(posts: Iterable[Tuple[Optional[Sequence[str]], Optional[str]]], delta: int) -> Counter:
+    """(tags, nationality) pairs -> {(facet, value): change}"""
+    changes = Counter()
+    for tags, nationality in posts:
+        for tag in set(tags or ()):
+            changes[("tag", tag)] += delta
+        if nationality:
+            changes[("nationality", nationality)] += delta
+    return changes
+
+
+async def adjust_facets(db, posts: Iterable[Tuple[Optional[Sequence[str]], Optional[str]]], delta: int):
+    """Add `delta` to the counts of every tag/nationality of `posts`. Call before commit."""
+    changes = facet_deltas(posts, delta)
+    if not changes:
+        return
+    stmt = insert(FacetCount).values([
+        {"facet": facet, "value": value, "count": change}
+        for (facet, value), change in sorted(changes.items())
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[FacetCount.facet, FacetCount.value],
+        set_={"count": FacetCount.count + stmt.excluded.count},
+    )
+    await db.execute(stmt)
+
+
+async def top_facets(db, limit: int = SIDEBAR_LIMIT) -> dict:
+    """{facet: [(value, count), ...]} with the biggest counts first"""
+    result = await db.execute(
+        select(FacetCount.facet, FacetCount.value, FacetCount.count)
+        .where(FacetCount.count > 0)
+        .order_by(FacetCount.count.desc(), FacetCount.value)
+    )
+    facets = {facet: [] for facet in FACETS}
+    for facet, value, count in result.all():
+        if len(facets.setdefault(facet, [])) < limit:
+            facets[facet].append((value, count))
+    return facets
+
+
+async def rebuild_facets(conn):
+    await conn.execute(text("DELETE FROM facet_counts"))
+    await conn.execute(text(REBUILD))
@@ -0,0 +1,133 @@
+"""
+Fragment Cache - Keeps rendered post-card HTML in memory
+Cards only change when likes or moderation change, so the key includes
+like_count, status and moderation_reason (shown on blocked post cards).
+A stale entry can never be served, even across gunicorn workers;
+invalidation just frees the memory early.
+"""
+import os
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Optional, Set, Tuple
+from markupsafe import Markup
+
+MAX_ENTRIES = int(os.getenv("FRAGMENT_CACHE_MAX_ENTRIES", "2000"))
+MAX_BYTES = int(os.getenv("FRAGMENT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))  # 32MB
+
+# Per-request values are rendered as these markers and filled in on every hit.
+# Postgres text columns can't hold NUL, so user content never contains them.
+RANK_SLOT = Markup("\x00rank\x00")
+LIKE_SLOT = Markup("\x00like\x00")
+
+
+class FragmentCache:
+    """Size-bounded LRU of rendered HTML fragments, indexed by post id."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple, str]" = OrderedDict()
+        self._by_post: Dict[str, Set[Tuple]] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Tuple) -> Optional[str]:
+        html = self._entries.get(key)
+        if html is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return html
+
+    def set(self, key: Tuple, html: str):
+        """Store a fragment. key[1] must be the post id."""
+        size = len(html)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = html
+        self._by_post.setdefault(key[1], set()).add(key)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def invalidate_post(self, post_id: Hashable) -> int:
+        """Drop every fragment for a post. Returns the number removed."""
+        keys = self._by_post.pop(str(post_id), set())
+        for key in keys:
+            html = self._entries.pop(key, None)
+            if html is not None:
+                self._bytes -= len(html)
+        return len(keys)
+
+    def invalidate_posts(self, post_ids: Iterable[Hashable]) -> int:
+        """Drop fragments for many posts at once (bulk moderation)"""
+        return sum(self.invalidate_post(post_id) for post_id in post_ids)
+
+    def clear(self):
+        self._entries.clear()
+        self._by_post.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def _drop(self, key: Tuple):
+        html = self._entries.pop(key)
+        self._bytes -= len(html)
+        keys = self._by_post.get(key[1])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_post[key[1]]
+
+
+card_cache = FragmentCache()
+
+
+def make_card_renderer(env, cache: FragmentCache = card_cache):
+    """
+    Build the render_card() template global.
+    Usage in templates: {{ render_card(post, 'feed', is_liked) }}
+    Variants: feed, leaderboard (pass rank), search, post.
+    """
+    card_template = env.get_template("components/card.html")
+    like_template = env.get_template("components/like_button.html")
+
+    def render_like_button(post, is_liked: bool) -> str:
+        key = ("like", str(post.id), post.like_count, post.status, bool(is_liked))
+        html = cache.get(key)
+        if html is None:
+            html = like_template.render(post=post, is_liked=bool(is_liked))
+            cache.set(key, html)
+        return html
+
+    def render_card(post, variant: str = "feed", is_liked: bool = False, rank: Optional[int] = None) -> Markup:
+        # A re-block with a new reason keeps like_count and status, so the reason is keyed too
+        key = (variant, str(post.id), post.like_count, post.status, post.moderation_reason)
+        html = cache.get(key)
+        if html is None:
+            html = card_template.render(
+                post=post, variant=variant, rank_slot=RANK_SLOT, like_slot=LIKE_SLOT
+            )
+            cache.set(key, html)
+        if LIKE_SLOT in html:
+            html = html.replace(LIKE_SLOT, render_like_button(post, is_liked))
+        if rank is not None:
+            html = html.replace(RANK_SLOT, str(rank))
+        return Markup(html)
+
+    return render_card
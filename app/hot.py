@@ -0,0 +1,48 @@
+"""
+Hot Ranking - Time-decayed score for the Hot tab, stored in posts.hot_score.
+
+    hot_score = log10(max(likes, 1)) + (created_at - HOT_EPOCH) / HOT_DECAY_SECONDS
+
+Instead of shrinking old scores, every newer post starts higher: with the
+default decay a post needs 10x the likes to outrank one 12.5 hours newer.
+Ordering between two posts never changes unless one of them is liked, so a
+score only has to be rewritten on a like, never just because time passed.
+"""
+import math
+import os
+from datetime import datetime
+from sqlalchemy import text
+
+HOT_EPOCH = 1704067200  # 2024-01-01 UTC; keeps scores small
+HOT_DECAY_SECONDS = float(os.getenv("HOT_DECAY_SECONDS", "45000"))
+HOT_REFRESH_BATCH = int(os.getenv("HOT_REFRESH_BATCH", "500"))
+
+
+def hot_score(like_count: int, created_at: datetime) -> float:
+    return math.log10(max(like_count or 0, 1)) + (created_at.timestamp() - HOT_EPOCH) / HOT_DECAY_SECONDS
+
+
+def hot_score_sql(likes: str = "like_count", created_at: str = "created_at") -> str:
+    """The same formula as SQL, for set-based updates"""
+    return (
+        f"LOG(GREATEST({likes}, 1)::float8) + "
+        f"(EXTRACT(EPOCH FROM {created_at})::float8 - {HOT_EPOCH}) / {HOT_DECAY_SECONDS}"
+    )
+
+
+# Rows written outside the app (seed_data, bulk_io, old rows) arrive without a score
+FILL_MISSING = text(f"""
+    UPDATE posts SET hot_score = {hot_score_sql()}
+    WHERE id IN (SELECT id FROM posts WHERE hot_score IS NULL LIMIT :limit)
+""")
+
+
+async def fill_missing_scores(engine, batch_size: int = HOT_REFRESH_BATCH) -> int:
+    """Score posts that have none yet, one short transaction per batch"""
+    total = 0
+    while True:
+        async with engine.begin() as conn:
+            result = await conn.execute(FILL_MISSING, {"limit": batch_size})
+        total += result.rowcount
+        if result.rowcount < batch_size:
+            return total
@@ -2,74 +2,118 @@
 Image Compression - Reduces images to ~50KB for decent quality
 Stores as base64 in database
 """
+import hashlib
 import io
+import os
+import time
 import base64
-from typing import Tuple, Optional
+from typing import BinaryIO, Tuple, Optional
 from PIL import Image
+from .metrics import image_compress_seconds, image_compressed_bytes, image_compress_errors
 
 MAX_UPLOAD_SIZE = 2 * 1024 * 1024  # 2MB max upload
 TARGET_SIZE = 50 * 1024  # 50KB target
+# Checked from the header, before any pixel is decoded (decompression bombs)
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", str(40_000_000)))
+ALLOWED_FORMATS = {"JPEG", "PNG", "GIF", "WEBP", "BMP"}
+# JPEGs are decoded at a reduced scale that is still at least this big
+DECODE_SIZE = 400
 
-def compress_to_blocky(file_content: bytes, content_type: str = None) -> Tuple[Optional[str], Optional[str]]:
+
+def open_upload(fileobj: BinaryIO, size: Optional[int] = None) -> Tuple[Optional[Image.Image], Optional[str]]:
     """
-    Compress image to ~50KB for decent quality.
-    Returns (base64_data, error_message)
+    Validate an upload from its header, then decode it as RGB.
+    Returns (image, error_message)
     """
-    # Check upload size
-    if len(file_content) > MAX_UPLOAD_SIZE:
-        return None, f"File too large. Max size is 2MB, got {len(file_content) / 1024 / 1024:.1f}MB"
-    
+    if size is not None and size > MAX_UPLOAD_SIZE:
+        image_compress_errors.inc()
+        return None, f"File too large. Max size is 2MB, got {size / 1024 / 1024:.1f}MB"
+
     try:
-        # Open image
-        img = Image.open(io.BytesIO(file_content))
-        
-        # Convert to RGB (needed for JPEG)
-        if img.mode in ('RGBA', 'P', 'LA', 'L'):
-            # Create white background for transparent images
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            if img.mode in ('RGBA', 'LA', 'P'):
-                if img.mode == 'P':
-                    img = img.convert('RGBA')
-                background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                img = background
-            else:
-                img = img.convert('RGB')
-        elif img.mode != 'RGB':
+        # Only reads the header
+        img = Image.open(fileobj)
+        if img.format not in ALLOWED_FORMATS:
+            image_compress_errors.inc()
+            return None, f"Unsupported image format: {img.format}"
+        width, height = img.size
+        if width * height > MAX_IMAGE_PIXELS:
+            image_compress_errors.inc()
+            return None, f"Image dimensions too large: {width}x{height}"
+
+        # We only keep ~200px, so let the JPEG decoder skip the detail
+        img.draft('RGB', (DECODE_SIZE, DECODE_SIZE))
+        img.load()
+        return _to_rgb(img), None
+
+    except Exception as e:
+        image_compress_errors.inc()
+        return None, f"Failed to process image: {str(e)}"
+
+
+def _to_rgb(img: Image.Image) -> Image.Image:
+    # Convert to RGB (needed for JPEG)
+    if img.mode in ('RGBA', 'P', 'LA', 'L'):
+        # Create white background for transparent images
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        if img.mode in ('RGBA', 'LA', 'P'):
+            if img.mode == 'P':
+                img = img.convert('RGBA')
+            background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
+            img = background
+        else:
             img = img.convert('RGB')
-        
+    elif img.mode != 'RGB':
+        img = img.convert('RGB')
+    return img
+
+
+def content_digest(img: Image.Image) -> str:
+    """sha256 of the decoded RGB pixels - equal only for the same picture"""
+    digest = hashlib.sha256(f"{img.width}x{img.height}:".encode())
+    digest.update(img.tobytes())
+    return digest.hexdigest()
+
+
+def compress_image(img: Image.Image) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Compress an RGB image to ~50KB for decent quality.
+    Returns (base64_data, error_message)
+    """
+    start = time.perf_counter()
+    try:
         # Strategy: Resize to very small (creates blocky effect when scaled up)
         # Then use lowest quality JPEG
-        
+
         # Calculate size while maintaining aspect ratio
         # ~50KB allows for ~200-300 pixel images at decent quality
         original_width, original_height = img.size
         aspect = original_width / original_height
-        
+
         # Start with a reasonable size
         target_pixels = 200  # Base size - will adjust if needed
-        
+
         if aspect > 1:
             new_width = int(target_pixels * aspect)
             new_height = target_pixels
         else:
             new_width = target_pixels
             new_height = int(target_pixels / aspect)
-        
+
         # Resize with LANCZOS for better quality
         img_small = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        
+
         # Try to get under 50KB by adjusting quality and size
         quality = 85
         result = io.BytesIO()
-        
+
         while True:
             result.seek(0)
             result.truncate()
             img_small.save(result, format='JPEG', quality=quality, optimize=True)
-            
+
             if result.tell() <= TARGET_SIZE:
                 break
-            
+
             # Reduce quality or size
             if quality > 10:
                 quality -= 10
@@ -79,22 +123,35 @@ def compress_to_blocky(file_content: bytes, content_type: str = None) -> Tuple[O
                 new_height = max(16, int(new_height * 0.8))
                 img_small = img.resize((new_width, new_height), Image.Resampling.NEAREST)
                 quality = 50
-                
+
             if new_width <= 16 and new_height <= 16 and quality <= 10:
                 break  # Can't go smaller
-        
+
+        final_bytes = result.tell()
         result.seek(0)
         encoded = base64.b64encode(result.read()).decode('utf-8')
-        
-        final_size = len(encoded) * 3 / 4 / 1024  # Approximate decoded size in KB
-        print(f"Compressed to {new_width}x{new_height} at quality {quality} = ~{final_size:.1f}KB")
-        
+
+        image_compress_seconds.observe(time.perf_counter() - start)
+        image_compressed_bytes.observe(final_bytes)
+
         return encoded, None
-        
+
     except Exception as e:
+        image_compress_errors.inc()
         return None, f"Failed to process image: {str(e)}"
 
 
+def compress_to_blocky(file_content: bytes, content_type: str = None) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Compress image bytes to ~50KB for decent quality.
+    Returns (base64_data, error_message)
+    """
+    img, error = open_upload(io.BytesIO(file_content), len(file_content))
+    if error:
+        return None, error
+    return compress_image(img)
+
+
 def get_data_url(base64_data: str) -> str:
     """Convert base64 data to data URL for img src"""
     return f"data:image/jpeg;base64,{base64_data}"
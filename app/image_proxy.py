@@ -4,11 +4,17 @@ Image Proxy - Server-side image fetching to bypass CORS/hotlink restrictions
 import httpx
 import re
 import os
+import time
 from typing import Optional, Tuple
 
 # Use /tmp for cache on serverless platforms like Render
 CACHE_DIR = "/tmp/image_cache"
 os.makedirs(CACHE_DIR, exist_ok=True)
+# Matches the Cache-Control the proxy route sends
+CACHE_TTL = float(os.getenv("PROXY_CACHE_TTL", "86400"))
+# URLs come from clients, so keep the disk use bounded
+CACHE_MAX_FILES = int(os.getenv("PROXY_CACHE_MAX_FILES", "500"))
+CACHE_MAX_ITEM_BYTES = 2 * 1024 * 1024
 
 async def resolve_image_url(url: str) -> str:
     """Resolve a URL to a direct image URL."""
@@ -84,25 +90,60 @@ async def fetch_image(url: str) -> Tuple[Optional[bytes], str]:
         return None, str(e)
 
 
+def _cache_path(url: str) -> str:
+    import hashlib
+    return f"{CACHE_DIR}/{hashlib.md5(url.encode()).hexdigest()}"
+
+
+def read_cached(url: str) -> Optional[Tuple[bytes, str]]:
+    """(data, content_type) from the disk cache if fresh, counting the lookup"""
+    from .metrics import proxy_cache_lookups
+
+    path = _cache_path(url)
+    try:
+        if time.time() - os.path.getmtime(path) < CACHE_TTL:
+            with open(path, 'rb') as f:
+                content_type, data = f.read().split(b"\n", 1)
+            proxy_cache_lookups.inc("hit")
+            return data, content_type.decode()
+    except (OSError, ValueError):
+        pass
+    proxy_cache_lookups.inc("miss")
+    return None
+
+
+def write_cached(url: str, data: bytes, content_type: str):
+    if len(data) > CACHE_MAX_ITEM_BYTES:
+        return
+    path = _cache_path(url)
+    try:
+        with open(f"{path}.tmp", 'wb') as f:
+            f.write(content_type.encode() + b"\n" + data)
+        os.replace(f"{path}.tmp", path)
+        _prune()
+    except OSError:
+        pass
+
+
+def _prune():
+    """Drop the oldest files once the cache holds more than CACHE_MAX_FILES"""
+    entries = sorted(os.scandir(CACHE_DIR), key=lambda entry: entry.stat().st_mtime)
+    for entry in entries[:max(0, len(entries) - CACHE_MAX_FILES)]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+
 async def get_cached_or_fetch(url: str) -> Tuple[Optional[bytes], str]:
     """Get image from cache or fetch it."""
-    import hashlib
-    
-    url_hash = hashlib.md5(url.encode()).hexdigest()
-    cache_path = f"{CACHE_DIR}/{url_hash}.jpg"
-    
-    # Check cache
-    if os.path.exists(cache_path):
-        with open(cache_path, 'rb') as f:
-            return f.read(), 'image/jpeg'
-    
+    cached = read_cached(url)
+    if cached:
+        return cached
+
     # Fetch and cache
     data, content_type = await fetch_image(url)
     if data:
-        try:
-            with open(cache_path, 'wb') as f:
-                f.write(data)
-        except:
-            pass
-    
+        write_cached(url, data, content_type)
+
     return data, content_type
@@ -1,9 +1,11 @@
 """
 Universal Image URL Resolver - Handles all major platforms
 """
+import os
 import re
+import asyncio
 import httpx
-from typing import Optional
+from typing import Dict, List, Optional
 from urllib.parse import urlparse, parse_qs
 
 async def resolve_image_url(url: str) -> Optional[str]:
@@ -214,4 +216,63 @@ async def resolve_image_url(url: str) -> Optional[str]:
         pass
     
     # Return original URL as final fallback
-    return url
\ No newline at end of file
+    return url
+
+# ============ BATCH RESOLUTION ============
+# Pages with several linked images resolve them in one request instead of one
+# round trip per URL. Concurrency is bounded globally and per host so a page
+# full of Instagram links can't hammer a single upstream.
+BATCH_CONCURRENCY = int(os.getenv("RESOLVE_BATCH_CONCURRENCY", "8"))
+BATCH_PER_HOST_CONCURRENCY = int(os.getenv("RESOLVE_BATCH_PER_HOST_CONCURRENCY", "2"))
+BATCH_DEADLINE = float(os.getenv("RESOLVE_BATCH_DEADLINE", "12.0"))
+
+
+async def resolve_image_urls(
+    urls: List[str],
+    deadline: float = BATCH_DEADLINE,
+    concurrency: int = BATCH_CONCURRENCY,
+    per_host_concurrency: int = BATCH_PER_HOST_CONCURRENCY,
+) -> List[Dict[str, Optional[str]]]:
+    """
+    Resolve many URLs concurrently with resolve_image_url.
+    Returns one entry per input URL (in order) with a status of
+    "ok", "error" or "timeout". URLs still pending when the deadline
+    expires are cancelled and reported as "timeout".
+    """
+    # Resolve each distinct URL once, but report every input position
+    unique_urls = list(dict.fromkeys(u.strip() for u in urls if u and u.strip()))
+
+    global_limit = asyncio.Semaphore(max(1, concurrency))
+    host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    async def resolve_one(url: str) -> Optional[str]:
+        host = (urlparse(url).hostname or "").lower()
+        host_limit = host_limits.setdefault(host, asyncio.Semaphore(max(1, per_host_concurrency)))
+        async with host_limit:
+            async with global_limit:
+                return await resolve_image_url(url)
+
+    tasks = {url: asyncio.create_task(resolve_one(url)) for url in unique_urls}
+    results: Dict[str, Dict[str, Optional[str]]] = {}
+
+    if tasks:
+        done, pending = await asyncio.wait(tasks.values(), timeout=deadline)
+        for task in pending:
+            task.cancel()
+        # Let cancelled tasks unwind so their httpx clients close cleanly
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        for url, task in tasks.items():
+            if task in pending:
+                results[url] = {"original": url, "resolved": None, "status": "timeout"}
+            elif task.exception() is not None:
+                results[url] = {"original": url, "resolved": None, "status": "error"}
+            else:
+                results[url] = {"original": url, "resolved": task.result(), "status": "ok"}
+
+    output = []
+    for url in urls:
+        key = url.strip() if url else ""
+        output.append(results.get(key, {"original": url, "resolved": None, "status": "error"}))
+    return output
@@ -1,43 +1,91 @@
 from fastapi import FastAPI, Request, Depends, Form, HTTPException, Query, UploadFile, File
 from fastapi.responses import HTMLResponse, RedirectResponse, Response
-from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pathlib import Path
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text, select, or_, func
+from sqlalchemy import text, select, update, or_, func, tuple_
+import hmac
+import re
+import time
 from uuid import UUID
-from datetime import datetime, timedelta
-import httpx
-from .database import get_db
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import List
+from urllib.parse import quote
+from .database import get_db, get_read_db, get_engine, mark_recent_write
 from .middleware import AuthMiddleware
-from .models import Post, Like
+from .compression import CompressionMiddleware
+from .models import Post, Like, Image
 from .admin_auth import (
     verify_password, create_access_token, get_admin_from_cookie, require_admin
 )
-from .image_proxy import resolve_image_url
+from .schemas import ResolveBatchRequest, ResolveBatchResponse
+from .fragment_cache import card_cache, make_card_renderer
+from .page_cache import page_cache, snapshot, make_etag, conditional_response, validator_headers
+from .static_assets import PrecompressedStaticFiles, asset_url
+from .startup import TEMPLATE_DIR, configure_templates, warm_up
+from .rate_limit import rate_limit
+from .reconcile import start_reconciler
+from .uploads import BodySizeLimitMiddleware
+from .facets import adjust_facets, top_facets
+from .hot import hot_score
+from .metrics import MetricsMiddleware, METRICS_TOKEN, proxy_upstream_seconds, register_cache, render as render_metrics
 
-app = FastAPI()
+# Setup templates
+BASE_DIR = Path(__file__).resolve().parent.parent
+templates = Jinja2Templates(directory=str(TEMPLATE_DIR))
+configure_templates(templates.env)
+templates.env.globals["render_card"] = make_card_renderer(templates.env)
+templates.env.globals["asset_url"] = asset_url
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await warm_up(templates.env, get_engine)
+    reconciler = start_reconciler(get_engine)
+    yield
+    if reconciler:
+        reconciler.cancel()
 
-# Add Middleware
+
+app = FastAPI(lifespan=lifespan)
+
+# Add Middleware (last added runs first)
+app.add_middleware(BodySizeLimitMiddleware)
 app.add_middleware(AuthMiddleware)
+app.add_middleware(CompressionMiddleware)
+# Outermost, so timings include compression and auth
+app.add_middleware(MetricsMiddleware)
+
+register_cache("cards", card_cache.stats)
+register_cache("pages", page_cache.stats)
 
 # Mount static files
-BASE_DIR = Path(__file__).resolve().parent.parent
-app.mount("/static", StaticFiles(directory=str(BASE_DIR / "static")), name="static")
+app.mount("/static", PrecompressedStaticFiles(directory=str(BASE_DIR / "static")), name="static")
 
-# Setup templates
-templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
+
+async def get_liked_post_ids(request: Request, db: AsyncSession, posts) -> set:
+    """Post ids (as strings) among `posts` that this visitor has liked"""
+    post_ids = [post.id for post in posts]
+    # A visitor who just got their cookie can't have liked anything yet
+    if not post_ids or getattr(request.state, "new_visitor", False):
+        return set()
+    result = await db.execute(
+        select(Like.post_id).where(Like.client_hash == request.state.user_hash, Like.post_id.in_(post_ids))
+    )
+    return {str(row[0]) for row in result.fetchall()}
 
 # ==================== PUBLIC ROUTES ====================
 
 @app.get("/", response_class=HTMLResponse)
-async def read_root(request: Request, db: AsyncSession = Depends(get_db)):
+async def read_root(request: Request, db: AsyncSession = Depends(get_read_db)):
     """Home page - random posts in grid"""
     result = await db.execute(
         select(Post).where(Post.status == "active")
         .order_by(func.random()).limit(50)
     )
     posts = result.scalars().all()
+    liked_post_ids = await get_liked_post_ids(request, db, posts)
     
     try:
         await db.execute(text("SELECT 1"))
@@ -50,35 +98,161 @@ async def read_root(request: Request, db: AsyncSession = Depends(get_db)):
         "db_status": db_status,
         "user_hash": request.state.user_hash[:8] + "...",
         "posts": posts,
+        "liked_post_ids": liked_post_ids,
         "active_page": "home"
     })
 
 @app.get("/leaderboard", response_class=HTMLResponse)
-async def leaderboard_page(request: Request, db: AsyncSession = Depends(get_db)):
+async def leaderboard_page(request: Request, db: AsyncSession = Depends(get_read_db)):
     """Leaderboard page - top liked posts from this week"""
-    seven_days_ago = datetime.utcnow() - timedelta(days=7)
-    result = await db.execute(
-        select(Post)
-        .where(Post.created_at >= seven_days_ago)
-        .where(Post.status == "active")
-        .order_by(Post.like_count.desc())
-        .limit(50)
-    )
-    posts = result.scalars().all()
-    
-    try:
-        await db.execute(text("SELECT 1"))
-        db_status = "Connected 🟢"
-    except:
-        db_status = "Failed 🔴"
+    async def load():
+        seven_days_ago = datetime.utcnow() - timedelta(days=7)
+        result = await db.execute(
+            select(Post)
+            .where(Post.created_at >= seven_days_ago)
+            .where(Post.status == "active")
+            .order_by(Post.like_count.desc())
+            .limit(50)
+        )
+        posts = result.scalars().all()
+        
+        try:
+            await db.execute(text("SELECT 1"))
+            db_status = "Connected 🟢"
+        except:
+            db_status = "Failed 🔴"
+        return snapshot(posts, db_status=db_status)
+
+    page = await page_cache.get_or_load(("leaderboard",), load)
+    user_hash = request.state.user_hash
+    liked_post_ids = await get_liked_post_ids(request, db, page["posts"])
+
+    etag = make_etag(page["version"], sorted(liked_post_ids), user_hash)
+    not_modified = conditional_response(request, etag, page["last_modified"])
+    if not_modified:
+        return not_modified
 
     return templates.TemplateResponse("leaderboard.html", {
         "request": request, 
-        "db_status": db_status,
-        "user_hash": request.state.user_hash[:8] + "...",
-        "posts": posts,
+        "db_status": page["db_status"],
+        "user_hash": user_hash[:8] + "...",
+        "posts": page["posts"],
+        "liked_post_ids": liked_post_ids,
         "active_page": "leaderboard"
-    })
+    }, headers=validator_headers(etag, page["last_modified"]))
+
+@app.get("/hot", response_class=HTMLResponse)
+async def hot_page(request: Request, db: AsyncSession = Depends(get_read_db)):
+    """Hot tab - likes weighed against age, served from the hot_score index"""
+    async def load():
+        result = await db.execute(
+            select(Post)
+            .where(Post.status == "active")
+            .order_by(Post.hot_score.desc().nulls_last())
+            .limit(50)
+        )
+        posts = result.scalars().all()
+        
+        try:
+            await db.execute(text("SELECT 1"))
+            db_status = "Connected 🟢"
+        except:
+            db_status = "Failed 🔴"
+        return snapshot(posts, db_status=db_status)
+
+    page = await page_cache.get_or_load(("hot",), load)
+    user_hash = request.state.user_hash
+    liked_post_ids = await get_liked_post_ids(request, db, page["posts"])
+
+    etag = make_etag(page["version"], sorted(liked_post_ids), user_hash)
+    not_modified = conditional_response(request, etag, page["last_modified"])
+    if not_modified:
+        return not_modified
+
+    return templates.TemplateResponse("leaderboard.html", {
+        "request": request, 
+        "db_status": page["db_status"],
+        "user_hash": user_hash[:8] + "...",
+        "posts": page["posts"],
+        "liked_post_ids": liked_post_ids,
+        "heading": "🔥 Hot - Most Hated Right Now",
+        "active_page": "hot"
+    }, headers=validator_headers(etag, page["last_modified"]))
+
+# ==================== BROWSE ROUTES ====================
+
+BROWSE_PAGE_SIZE = 24
+
+def _parse_cursor(before: str):
+    """Keyset cursor "<created_at iso>_<id>" of the last post on the previous page"""
+    try:
+        created_at, post_id = before.rsplit("_", 1)
+        return datetime.fromisoformat(created_at), UUID(post_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def browse_page(request: Request, db: AsyncSession, cache_key: tuple, condition,
+                      heading: str, base_url: str, before: str):
+    """Newest-first feed for one tag or nationality, paged by (created_at, id)"""
+    async def load():
+        stmt = select(Post).where(Post.status == "active", condition)
+        if before:
+            stmt = stmt.where(tuple_(Post.created_at, Post.id) < tuple_(*_parse_cursor(before)))
+        result = await db.execute(
+            stmt.order_by(Post.created_at.desc(), Post.id.desc()).limit(BROWSE_PAGE_SIZE + 1)
+        )
+        posts = result.scalars().all()
+        next_url = None
+        if len(posts) > BROWSE_PAGE_SIZE:
+            posts = posts[:BROWSE_PAGE_SIZE]
+            last = posts[-1]
+            next_url = f"{base_url}?before={quote(last.created_at.isoformat())}_{last.id}"
+        return snapshot(posts, next_url=next_url)
+
+    page = await page_cache.get_or_load(cache_key + (before,), load)
+    user_hash = request.state.user_hash
+    liked_post_ids = await get_liked_post_ids(request, db, page["posts"])
+
+    etag = make_etag(page["version"], sorted(liked_post_ids), user_hash)
+    not_modified = conditional_response(request, etag, page["last_modified"])
+    if not_modified:
+        return not_modified
+
+    return templates.TemplateResponse("index.html", {
+        "request": request,
+        "user_hash": user_hash[:8] + "...",
+        "posts": page["posts"],
+        "liked_post_ids": liked_post_ids,
+        "heading": heading,
+        "next_url": page["next_url"],
+        "active_page": "browse"
+    }, headers=validator_headers(etag, page["last_modified"]))
+
+@app.get("/tag/{tag}", response_class=HTMLResponse)
+async def tag_page(request: Request, tag: str, before: str = Query(""), db: AsyncSession = Depends(get_read_db)):
+    """Posts with a tag - tags @> ARRAY[tag] uses the GIN index"""
+    tag = tag.strip().lower()
+    return await browse_page(
+        request, db, ("tag", tag), Post.tags.contains([tag]),
+        f"#{tag}", f"/tag/{quote(tag)}", before
+    )
+
+@app.get("/nationality/{code}", response_class=HTMLResponse)
+async def nationality_page(request: Request, code: str, before: str = Query(""), db: AsyncSession = Depends(get_read_db)):
+    """Posts from one nationality, newest first off (nationality, created_at)"""
+    code = code.strip().upper()
+    return await browse_page(
+        request, db, ("nationality", code), Post.nationality == code,
+        f"Nationality: {code}", f"/nationality/{quote(code)}", before
+    )
+
+@app.get("/facets", response_class=HTMLResponse)
+async def facets_fragment(request: Request, db: AsyncSession = Depends(get_read_db)):
+    """Sidebar tag/nationality counts, loaded by htmx from the facet_counts rollup"""
+    facets = await page_cache.get_or_load(("facets",), lambda: top_facets(db))
+    return templates.TemplateResponse("components/facets.html", {
+        "request": request, "facets": facets
+    }, headers={"Cache-Control": "public, max-age=60"})
 
 @app.get("/create", response_class=HTMLResponse)
 async def create_page(request: Request):
@@ -96,57 +270,77 @@ async def create_page(request: Request):
     })
 
 @app.get("/post/{post_id}", response_class=HTMLResponse)
-async def view_post(request: Request, post_id: UUID, db: AsyncSession = Depends(get_db)):
+async def view_post(request: Request, post_id: UUID, db: AsyncSession = Depends(get_read_db)):
     """Individual post page with SEO metadata"""
-    result = await db.execute(select(Post).where(Post.id == post_id))
-    post = result.scalar_one_or_none()
-    
-    if not post:
+    async def load():
+        result = await db.execute(select(Post).where(Post.id == post_id))
+        post = result.scalar_one_or_none()
+        
+        try:
+            await db.execute(text("SELECT 1"))
+            db_status = "Connected 🟢"
+        except:
+            db_status = "Failed 🔴"
+        # Missing posts are cached too, so a dead share link can't hammer the DB
+        return snapshot([post] if post else [], dated=True, db_status=db_status)
+
+    page = await page_cache.get_or_load(("post", post_id), load)
+    if not page["posts"]:
         raise HTTPException(status_code=404, detail="Post not found")
+    post = page["posts"][0]
     
     user_hash = request.state.user_hash
-    liked_result = await db.execute(select(Like.post_id).where(Like.client_hash == user_hash))
-    liked_post_ids = {str(row[0]) for row in liked_result.fetchall()}
-    
-    try:
-        await db.execute(text("SELECT 1"))
-        db_status = "Connected 🟢"
-    except:
-        db_status = "Failed 🔴"
+    liked_post_ids = await get_liked_post_ids(request, db, [post])
+
+    # og:url and the share box echo the request URL
+    etag = make_etag(page["version"], sorted(liked_post_ids), user_hash, str(request.url))
+    not_modified = conditional_response(request, etag, page["last_modified"])
+    if not_modified:
+        return not_modified
     
     return templates.TemplateResponse("post.html", {
         "request": request,
         "post": post,
-        "db_status": db_status,
+        "db_status": page["db_status"],
         "user_hash": user_hash[:8] + "...",
         "liked_post_ids": liked_post_ids
-    })
+    }, headers=validator_headers(etag, page["last_modified"]))
 
 @app.get("/search", response_class=HTMLResponse)
-async def search_posts(request: Request, q: str = Query(""), db: AsyncSession = Depends(get_db)):
+async def search_posts(request: Request, q: str = Query(""), db: AsyncSession = Depends(get_read_db)):
     query = q.strip()
     if not query:
         return HTMLResponse("")
     
-    search_pattern = f"%{query}%"
-    result = await db.execute(
-        select(Post).where(
-            or_(
-                Post.title.ilike(search_pattern),
-                Post.description.ilike(search_pattern),
-                Post.reason.ilike(search_pattern),
-                Post.tags.any(query.lower())
-            )
-        ).order_by(Post.like_count.desc()).limit(20)
-    )
-    posts = result.scalars().all()
+    async def load():
+        search_pattern = f"%{query}%"
+        result = await db.execute(
+            select(Post).where(
+                or_(
+                    Post.title.ilike(search_pattern),
+                    Post.description.ilike(search_pattern),
+                    Post.reason.ilike(search_pattern),
+                    Post.tags.contains([query.lower()])
+                )
+            ).order_by(Post.like_count.desc()).limit(20)
+        )
+        return snapshot(result.scalars().all())
+
+    page = await page_cache.get_or_load(("search", query), load)
+
+    etag = make_etag(page["version"], query)
+    not_modified = conditional_response(request, etag, page["last_modified"])
+    if not_modified:
+        return not_modified
     
     # Return cards for search results
     return templates.TemplateResponse("components/search_grid.html", {
-        "request": request, "posts": posts, "query": query
-    })
+        "request": request, "posts": page["posts"], "query": query
+    }, headers=validator_headers(etag, page["last_modified"]))
+
+MAX_TAG_LENGTH = 30
 
-@app.post("/posts", response_class=HTMLResponse)
+@app.post("/posts", response_class=HTMLResponse, dependencies=[Depends(rate_limit("create_post"))])
 async def create_post(
     request: Request, 
     image: UploadFile = File(None),
@@ -158,36 +352,38 @@ async def create_post(
     nationality: str = Form(""),
     db: AsyncSession = Depends(get_db)
 ):
-    # Build tags list from dropdowns
-    tag_list = [t.strip().lower() for t in [tag1, tag2] if t.strip()]
+    # Build tags list from dropdowns (the form isn't the only client, so cap them)
+    tag_list = [t.strip().lower()[:MAX_TAG_LENGTH] for t in [tag1, tag2] if t.strip()]
     
-    # Process uploaded image - compress to ~3KB blocky style
-    image_data = None
+    # Process uploaded image - compress to ~3KB blocky style, stored once per distinct image
+    image_id = None
     if image and image.filename:
-        from .image_processor import compress_to_blocky
-        file_content = await image.read()
-        image_data, error = compress_to_blocky(file_content, image.content_type)
+        from .uploads import ingest_upload
+        image_id, error = await ingest_upload(db, image)
         if error:
             print(f"Image compression error: {error}")
             # Continue without image on error
     
     new_post = Post(
-        image_data=image_data,
+        image_id=image_id,
         title=title[:50],
         description=description[:180] if description else None,
         reason=reason[:250] if reason else None,
         tags=tag_list,
         nationality=nationality if nationality else None,
-        author_hash=request.state.user_hash
+        author_hash=request.state.user_hash,
+        # created_at comes from the database a moment later; close enough to rank by
+        hot_score=hot_score(0, datetime.now(timezone.utc))
     )
     db.add(new_post)
+    await adjust_facets(db, [(new_post.tags, new_post.nationality)], +1)
     await db.commit()
     await db.refresh(new_post)
     
     # Redirect to home after creating
-    return RedirectResponse(url="/", status_code=303)
+    return mark_recent_write(RedirectResponse(url="/", status_code=303))
 
-@app.post("/posts/{post_id}/like", response_class=HTMLResponse)
+@app.post("/posts/{post_id}/like", response_class=HTMLResponse, dependencies=[Depends(rate_limit("like_post"))])
 async def like_post(request: Request, post_id: UUID, db: AsyncSession = Depends(get_db)):
     user_hash = request.state.user_hash
     result = await db.execute(select(Post).where(Post.id == post_id))
@@ -213,12 +409,35 @@ async def like_post(request: Request, post_id: UUID, db: AsyncSession = Depends(
         db.add(Like(post_id=post_id, client_hash=user_hash))
         post.like_count += 1
         is_liked = True
+    post.hot_score = hot_score(post.like_count, post.created_at)
     
     await db.commit()
     await db.refresh(post)
-    return templates.TemplateResponse("components/like_button.html", {
+    card_cache.invalidate_post(post_id)
+    page_cache.invalidate(("post", post_id))
+    return mark_recent_write(templates.TemplateResponse("components/like_button.html", {
         "request": request, "post": post, "is_liked": is_liked
-    })
+    }))
+
+@app.get("/img/post/{post_id}")
+async def serve_post_image(post_id: UUID, db: AsyncSession = Depends(get_read_db)):
+    """Inline images of posts from before the images table"""
+    from .uploads import image_response
+    result = await db.execute(select(Post.image_data).where(Post.id == post_id))
+    data = result.scalar_one_or_none()
+    if data is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return image_response(data)
+
+@app.get("/img/{image_id}")
+async def serve_image(image_id: UUID, db: AsyncSession = Depends(get_read_db)):
+    """Uploaded images, shared between posts with the same picture"""
+    from .uploads import image_response
+    result = await db.execute(select(Image.data).where(Image.id == image_id))
+    data = result.scalar_one_or_none()
+    if data is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return image_response(data)
 
 # ==================== IMAGE PROXY ROUTES ====================
 
@@ -231,6 +450,19 @@ async def proxy_image(url: str):
     if not url:
         raise HTTPException(status_code=400, detail="URL parameter required")
     
+    # Deferred so httpx isn't paid for on cold start
+    import httpx
+    from .image_proxy import resolve_image_url, read_cached, write_cached
+    
+    proxy_headers = {
+        'Cache-Control': 'public, max-age=86400',  # Cache for 24 hours
+        'Access-Control-Allow-Origin': '*',  # Allow CORS
+    }
+    cached = read_cached(url)
+    if cached:
+        data, content_type = cached
+        return Response(content=data, media_type=content_type, headers=proxy_headers)
+    
     try:
         # First, resolve the URL to a direct image
         resolved_url = await resolve_image_url(url)
@@ -246,22 +478,26 @@ async def proxy_image(url: str):
                 'Referer': resolved_url,
             }
             
-            response = await client.get(resolved_url, headers=headers)
+            fetch_start = time.perf_counter()
+            try:
+                response = await client.get(resolved_url, headers=headers)
+            except httpx.TimeoutException:
+                proxy_upstream_seconds.observe(time.perf_counter() - fetch_start, "timeout")
+                raise
+            proxy_upstream_seconds.observe(time.perf_counter() - fetch_start, str(response.status_code))
             
             if response.status_code != 200:
                 raise HTTPException(status_code=response.status_code, detail="Failed to fetch image")
             
             # Determine content type
             content_type = response.headers.get('content-type', 'image/jpeg')
+            write_cached(url, response.content, content_type)
             
             # Return the image with proper headers
             return Response(
                 content=response.content,
                 media_type=content_type,
-                headers={
-                    'Cache-Control': 'public, max-age=86400',  # Cache for 24 hours
-                    'Access-Control-Allow-Origin': '*',  # Allow CORS
-                }
+                headers=proxy_headers
             )
     
     except httpx.TimeoutException:
@@ -280,12 +516,25 @@ async def resolve_only(url: str):
     if not url:
         raise HTTPException(status_code=400, detail="URL parameter required")
     
+    from .image_proxy import resolve_image_url
     try:
         resolved = await resolve_image_url(url)
         return {"original": url, "resolved": resolved}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@app.post("/resolve/images", response_model=ResolveBatchResponse)
+async def resolve_batch(payload: ResolveBatchRequest):
+    """
+    Resolve several URLs in one request with bounded concurrency.
+    URLs that miss the overall deadline come back with status "timeout".
+    Usage: POST /resolve/images {"urls": ["https://imgur.com/abc", ...]}
+    """
+    from .image_resolver import resolve_image_urls
+    results = await resolve_image_urls(payload.urls)
+    return {"results": results}
+
 # ==================== ADMIN ROUTES ====================
 
 @app.get("/admin/login", response_class=HTMLResponse)
@@ -330,7 +579,8 @@ async def admin_panel(request: Request, db: AsyncSession = Depends(get_db)):
     
     return templates.TemplateResponse("admin/panel.html", {
         "request": request, "posts": posts, "db_status": db_status,
-        "user_hash": "ADMIN"
+        "user_hash": "ADMIN", "moderated": request.query_params.get("moderated"),
+        "moderated_action": request.query_params.get("action")
     })
 
 @app.post("/admin/posts/{post_id}/block", response_class=HTMLResponse)
@@ -341,15 +591,21 @@ async def block_post(
     if not get_admin_from_cookie(request):
         raise HTTPException(status_code=401, detail="Unauthorized")
     
-    result = await db.execute(select(Post).where(Post.id == post_id))
+    # Row lock until commit: a concurrent block waits, then sees "blocked"
+    # and leaves the facet counts alone
+    result = await db.execute(select(Post).where(Post.id == post_id).with_for_update())
     post = result.scalar_one_or_none()
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
     
+    if post.status == "active":
+        await adjust_facets(db, [(post.tags, post.nationality)], -1)
     post.status = "blocked"
     post.moderation_reason = reason
     await db.commit()
     await db.refresh(post)
+    card_cache.invalidate_post(post_id)
+    page_cache.invalidate(("post", post_id))
     
     return templates.TemplateResponse("admin/post_row.html", {"request": request, "post": post})
 
@@ -358,14 +614,134 @@ async def unblock_post(request: Request, post_id: UUID, db: AsyncSession = Depen
     if not get_admin_from_cookie(request):
         raise HTTPException(status_code=401, detail="Unauthorized")
     
-    result = await db.execute(select(Post).where(Post.id == post_id))
+    result = await db.execute(select(Post).where(Post.id == post_id).with_for_update())
     post = result.scalar_one_or_none()
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
     
+    if post.status != "active":
+        await adjust_facets(db, [(post.tags, post.nationality)], +1)
     post.status = "active"
     post.moderation_reason = None
     await db.commit()
     await db.refresh(post)
+    card_cache.invalidate_post(post_id)
+    page_cache.invalidate(("post", post_id))
     
-    return templates.TemplateResponse("admin/post_row.html", {"request": request, "post": post})
\ No newline at end of file
+    return templates.TemplateResponse("admin/post_row.html", {"request": request, "post": post})
+
+def _parse_admin_datetime(value: str, field: str):
+    """datetime-local form values, taken as UTC"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {field}")
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+AUTHOR_PREFIX_RE = re.compile(r"[0-9a-f]{8,64}")
+
+@app.post("/admin/posts/bulk")
+async def bulk_moderate(
+    request: Request,
+    action: str = Form(...),
+    scope: str = Form("selected"),
+    reason: str = Form(""),
+    post_ids: List[UUID] = Form([]),
+    tag: str = Form(""),
+    author_hash: str = Form(""),
+    created_after: str = Form(""),
+    created_before: str = Form(""),
+    db: AsyncSession = Depends(get_db)
+):
+    """Block or unblock every selected or matching post in one UPDATE"""
+    if not get_admin_from_cookie(request):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    if action not in ("block", "unblock"):
+        raise HTTPException(status_code=400, detail="Unknown action")
+    if action == "block" and not reason.strip():
+        raise HTTPException(status_code=400, detail="A reason is required to block")
+    
+    conditions = []
+    if scope == "selected":
+        if not post_ids:
+            raise HTTPException(status_code=400, detail="No posts selected")
+        conditions.append(Post.id.in_(post_ids))
+    else:
+        if tag.strip():
+            conditions.append(Post.tags.contains([tag.strip().lower()]))
+        if author_hash.strip():
+            # The panel shows an 8 character prefix, so accept one - but no
+            # shorter, or a single character would match a large share of posts
+            prefix = author_hash.strip().lower()
+            if not AUTHOR_PREFIX_RE.fullmatch(prefix):
+                raise HTTPException(status_code=400, detail="author_hash must be 8-64 hex characters")
+            conditions.append(Post.author_hash.startswith(prefix, autoescape=True))
+        after = _parse_admin_datetime(created_after, "created_after")
+        before = _parse_admin_datetime(created_before, "created_before")
+        if after:
+            conditions.append(Post.created_at >= after)
+        if before:
+            conditions.append(Post.created_at < before)
+        if not conditions:
+            raise HTTPException(status_code=400, detail="Give at least one filter")
+    
+    if action == "block":
+        values = {"status": "blocked", "moderation_reason": reason.strip()}
+        conditions.append(Post.status == "active")
+    else:
+        values = {"status": "active", "moderation_reason": None}
+        conditions.append(Post.status == "blocked")
+    
+    result = await db.execute(
+        update(Post).where(*conditions).values(**values)
+        .returning(Post.id, Post.tags, Post.nationality)
+    )
+    rows = result.fetchall()
+    changed = [row[0] for row in rows]
+    await adjust_facets(db, [(row[1], row[2]) for row in rows], -1 if action == "block" else +1)
+    await db.commit()
+    
+    card_cache.invalidate_posts(changed)
+    page_cache.invalidate_many([("post", post_id) for post_id in changed])
+    print(f"Bulk {action}: {len(changed)} posts")
+    
+    return RedirectResponse(url=f"/admin?moderated={len(changed)}&action={action}", status_code=303)
+
+@app.get("/admin/slow-queries", response_class=HTMLResponse)
+async def admin_slow_queries(request: Request):
+    if not get_admin_from_cookie(request):
+        return RedirectResponse(url="/admin/login", status_code=303)
+    from . import slow_queries
+    return templates.TemplateResponse("admin/slow_queries.html", {
+        "request": request, "entries": slow_queries.entries(),
+        "threshold_ms": slow_queries.SLOW_QUERY_MS, "user_hash": "ADMIN"
+    })
+
+@app.post("/admin/slow-queries/clear")
+async def admin_clear_slow_queries(request: Request):
+    if not get_admin_from_cookie(request):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    from . import slow_queries
+    slow_queries.clear()
+    return RedirectResponse(url="/admin/slow-queries", status_code=303)
+
+@app.get("/admin/cache/stats")
+async def admin_cache_stats(request: Request):
+    if not get_admin_from_cookie(request):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return {"cards": card_cache.stats(), "pages": page_cache.stats()}
+
+
+# ==================== METRICS ROUTES ====================
+
+@app.get("/metrics")
+async def metrics(request: Request, token: str = None):
+    """Prometheus scrape endpoint. Set METRICS_TOKEN to require a bearer token."""
+    if METRICS_TOKEN:
+        auth = request.headers.get("authorization", "")
+        supplied = auth[7:] if auth.lower().startswith("bearer ") else token
+        if not supplied or not hmac.compare_digest(supplied, METRICS_TOKEN):
+            raise HTTPException(status_code=401, detail="Unauthorized")
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4")
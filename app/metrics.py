@@ -0,0 +1,275 @@
+"""
+Metrics - In-process counters and histograms exposed in Prometheus text format
+Recording is a few dict operations per event, cheap enough to leave on in
+production. Each gunicorn worker keeps its own numbers; Prometheus sees
+whichever worker answers the scrape, so compare rates, not absolute values.
+"""
+import os
+import re
+import time
+from contextvars import ContextVar
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+SIZE_BUCKETS = (1024, 4096, 8192, 16384, 32768, 51200, 65536, 131072)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in self._values.items():
+            yield self.name, _labels(self.labelnames, labels), value
+
+
+class Gauge(Counter):
+    """Set directly, or computed at scrape time from a callback that returns
+    {label_tuple: value}. kind="counter" is for callbacks reading totals."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (),
+                 callback: Optional[Callable[[], Dict[Tuple, float]]] = None, kind: str = "gauge"):
+        super().__init__(name, help, labelnames)
+        self.callback = callback
+        self.kind = kind
+
+    def set(self, *labels, value: float):
+        self._values[labels] = value
+
+    def samples(self):
+        if self.callback is not None:
+            self._values = dict(self.callback())
+        yield from super().samples()
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        entry = self._values.get(labels)
+        if entry is None:
+            entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def samples(self):
+        for labels, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket", _labels(self.labelnames, labels, le), cumulative
+            yield f"{self.name}_sum", _labels(self.labelnames, labels), total
+            yield f"{self.name}_count", _labels(self.labelnames, labels), count
+
+
+_registry: List = []
+
+
+def register(metric):
+    _registry.append(metric)
+    return metric
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        try:
+            samples = list(metric.samples())
+        except Exception as e:
+            # A broken collector must not take the whole scrape down
+            lines.append(f"# {metric.name} collection failed: {_escape(e)}")
+            continue
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in samples:
+            lines.append(f"{name}{labels} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# ==================== METRICS ====================
+
+http_request_seconds = register(Histogram(
+    "ihtp_http_request_duration_seconds", "Request latency by route", ("method", "route", "status"),
+))
+db_query_seconds = register(Histogram(
+    "ihtp_db_query_duration_seconds", "Statement execution time", ("engine", "operation", "table"),
+    buckets=QUERY_BUCKETS,
+))
+db_query_errors = register(Counter(
+    "ihtp_db_query_errors_total", "Statements that raised", ("engine", "operation", "table"),
+))
+image_compress_seconds = register(Histogram(
+    "ihtp_image_compress_duration_seconds", "compress_to_blocky time per upload",
+))
+image_compressed_bytes = register(Histogram(
+    "ihtp_image_compressed_bytes", "Stored JPEG size after compression", buckets=SIZE_BUCKETS,
+))
+image_compress_errors = register(Counter(
+    "ihtp_image_compress_errors_total", "Uploads compress_to_blocky rejected or failed on",
+))
+proxy_upstream_seconds = register(Histogram(
+    "ihtp_proxy_upstream_duration_seconds", "Image proxy upstream fetch time", ("outcome",),
+))
+proxy_cache_lookups = register(Counter(
+    "ihtp_proxy_cache_lookups_total", "Image proxy disk cache lookups", ("result",),
+))
+
+_engines: Dict[str, object] = {}
+_cache_stats: Dict[str, Callable[[], dict]] = {}
+
+
+def _pool_stats() -> Dict[Tuple, float]:
+    values = {}
+    for name, engine in _engines.items():
+        pool = engine.sync_engine.pool
+        for stat in ("size", "checkedin", "checkedout", "overflow"):
+            method = getattr(pool, stat, None)
+            if method is not None:
+                values[(name, stat)] = method()
+    return values
+
+
+def _cache_values(field: str) -> Callable[[], Dict[Tuple, float]]:
+    def collect():
+        return {(name,): stats()[field] for name, stats in _cache_stats.items()}
+    return collect
+
+
+register(Gauge("ihtp_db_pool_connections", "Connection pool state", ("engine", "state"), callback=_pool_stats))
+register(Gauge("ihtp_cache_hits_total", "Cache hits", ("cache",), callback=_cache_values("hits"), kind="counter"))
+register(Gauge("ihtp_cache_misses_total", "Cache misses", ("cache",), callback=_cache_values("misses"), kind="counter"))
+register(Gauge("ihtp_cache_entries", "Entries currently cached", ("cache",), callback=_cache_values("entries")))
+
+
+def register_cache(name: str, stats: Callable[[], dict]):
+    """Expose a cache whose stats() returns hits/misses/entries"""
+    _cache_stats[name] = stats
+
+
+# ==================== DATABASE ====================
+
+_TABLE_PATTERN = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+\"?(\w+)", re.I)
+
+
+@lru_cache(maxsize=1024)
+def describe_statement(statement: str) -> Tuple[str, str]:
+    """(operation, table) labels for a SQL statement, cached per statement text"""
+    words = statement.lstrip().split(None, 1)
+    operation = words[0].upper() if words else "OTHER"
+    match = _TABLE_PATTERN.search(statement)
+    return operation, match.group(1).lower() if match else "-"
+
+
+def instrument_engine(engine, name: str = "primary"):
+    """Time every statement through SQLAlchemy cursor events"""
+    from sqlalchemy import event
+
+    sync_engine = engine.sync_engine
+    _engines[name] = engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("query_start")
+        if starts:
+            db_query_seconds.observe(time.perf_counter() - starts.pop(), name, *describe_statement(statement))
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(context):
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+        db_query_errors.inc(name, *describe_statement(context.statement or ""))
+
+
+# ==================== HTTP ====================
+
+# Scope of the request being served, so DB hooks can tell which route ran a query
+request_scope: ContextVar[Optional[Scope]] = ContextVar("request_scope", default=None)
+
+
+def route_label(scope: Scope) -> str:
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    endpoint = scope.get("endpoint")
+    if endpoint is not None:
+        # Mounted apps (StaticFiles) have no route template; use the mount point
+        return getattr(endpoint, "__name__", None) or scope.get("root_path") or "mount"
+    # Unmatched paths would otherwise create one series per URL
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI request timer; labels by route template, not raw path"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = request_scope.set(scope)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            request_scope.reset(token)
+            http_request_seconds.observe(
+                time.perf_counter() - start, scope["method"], route_label(scope), str(status)
+            )
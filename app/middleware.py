@@ -1,45 +1,90 @@
 import uuid
 import hashlib
 import os
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from functools import lru_cache
+from typing import Iterable, Optional
+from fastapi import Response
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-class AuthMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app: ASGIApp):
-        super().__init__(app)
+# Paths that never need an identity (assets, image proxy, stored images, the
+# facets fragment). Their responses are publicly cacheable, so a Set-Cookie on
+# them could be stored by a shared cache and handed to every visitor
+DEFAULT_EXCLUDED_PREFIXES = ("/static", "/proxy/image", "/img/", "/facets")
+HASH_CACHE_SIZE = int(os.getenv("AUTH_HASH_CACHE_SIZE", "4096"))
+
+
+class AuthMiddleware:
+    """
+    Pure ASGI middleware that gives every visitor an anonymous identity.
+    Unlike BaseHTTPMiddleware it doesn't wrap the response in a task/stream,
+    so streaming responses pass straight through.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        excluded_prefixes: Optional[Iterable[str]] = None,
+        hash_cache_size: int = HASH_CACHE_SIZE,
+    ):
+        self.app = app
         self.secret_key = os.getenv("SECRET_KEY", "dev-secret-do-not-use-in-prod")
+        self.excluded_prefixes = tuple(
+            DEFAULT_EXCLUDED_PREFIXES if excluded_prefixes is None else excluded_prefixes
+        )
+        # Returning visitors send the same anon_id on every request
+        self.hash_identity = lru_cache(maxsize=hash_cache_size)(self._hash_identity)
+
+    def _hash_identity(self, anon_id: str) -> str:
+        # Hash formula: SHA256(anon_id + SECRET)
+        # We hash it so we never work with the raw ID in our logic/database
+        hash_input = f"{anon_id}{self.secret_key}".encode()
+        return hashlib.sha256(hash_input).hexdigest()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"].startswith(self.excluded_prefixes):
+            await self.app(scope, receive, send)
+            return
 
-    async def dispatch(self, request: Request, call_next):
         # 1. Get Cookie
-        anon_id = request.cookies.get("anon_id")
+        anon_id = HTTPConnection(scope).cookies.get("anon_id")
         new_cookie = False
 
         # 2. If missing, generate new
         if not anon_id:
             anon_id = str(uuid.uuid4())
             new_cookie = True
-        
+
         # 3. Attach hashed ID to request state for endpoints to use
-        # Hash formula: SHA256(anon_id + SECRET)
-        # We hash it so we never work with the raw ID in our logic/database
-        hash_input = f"{anon_id}{self.secret_key}".encode()
-        user_hash = hashlib.sha256(hash_input).hexdigest()
-        
-        request.state.user_hash = user_hash
-        
-        # 4. Process Request
-        response = await call_next(request)
-        
-        # 5. Set Cookie if new
-        if new_cookie:
-            response.set_cookie(
-                key="anon_id", 
-                value=anon_id,
-                httponly=True,
-                secure=False, # Set to True in Production (HTTPS)
-                samesite="lax",
-                max_age=315360000 # 10 years
-            )
-            
-        return response
+        state = scope.setdefault("state", {})
+        state["user_hash"] = self.hash_identity(anon_id)
+        state["new_visitor"] = new_cookie
+
+        if not new_cookie:
+            await self.app(scope, receive, send)
+            return
+
+        # 4. Set Cookie if new, on the response start message
+        cookie_header = self._cookie_header(anon_id)
+
+        async def send_with_cookie(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("set-cookie", cookie_header)
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+    @staticmethod
+    def _cookie_header(anon_id: str) -> str:
+        response = Response()
+        response.set_cookie(
+            key="anon_id",
+            value=anon_id,
+            httponly=True,
+            secure=False, # Set to True in Production (HTTPS)
+            samesite="lax",
+            max_age=315360000 # 10 years
+        )
+        return response.headers["set-cookie"]
@@ -1,16 +1,33 @@
-from sqlalchemy import Column, String, Integer, ARRAY, DateTime, Text, ForeignKey, LargeBinary
+from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey, LargeBinary, Float, Index
 from sqlalchemy.sql import func
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, ARRAY
 import uuid
 from .database import Base
 
+class Image(Base):
+    """Compressed upload, shared by every post that uploaded the same picture"""
+    __tablename__ = "images"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    data = Column(Text, nullable=False)  # Base64 encoded JPEG
+    digest = Column(String(64), nullable=True)  # sha256 of the decoded pixels; NULL on legacy rows
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # Dedup is exact: the same decoded pixels, nothing looser
+        Index("uq_images_digest", "digest", unique=True),
+    )
+
 class Post(Base):
     __tablename__ = "posts"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     
     # Content Fields
-    image_data = Column(Text, nullable=True)  # Base64 encoded image
+    image_data = Column(Text, nullable=True)  # Base64 encoded image (posts from before the images table)
+    image_id = Column(UUID(as_uuid=True), ForeignKey("images.id", ondelete="SET NULL"), nullable=True)
     title = Column(String(50), nullable=False)
     description = Column(String(180), nullable=True)
     reason = Column(String(250), nullable=True)
@@ -23,16 +40,44 @@ class Post(Base):
     
     # Metadata
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
     author_hash = Column(String, nullable=False)
     like_count = Column(Integer, default=0)
+    hot_score = Column(Float, nullable=True)  # see app/hot.py
     
     # Moderation
     status = Column(String(20), default="active")
     moderation_reason = Column(String, nullable=True)
 
+    __table_args__ = (
+        # Hot tab: ORDER BY hot_score DESC NULLS LAST over active posts
+        Index("ix_posts_hot_score", hot_score.desc().nulls_last(), postgresql_where=(status == "active")),
+        # /tag/{tag}: tags @> ARRAY[...]
+        Index("ix_posts_tags", tags, postgresql_using="gin"),
+        # /nationality/{code}, newest first
+        Index("ix_posts_nationality", nationality, created_at.desc(), id.desc()),
+    )
+
 class Like(Base):
     __tablename__ = "likes"
 
     post_id = Column(UUID(as_uuid=True), ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
     client_hash = Column(String, primary_key=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+class RateLimit(Base):
+    """Token buckets for RATE_LIMIT_BACKEND=postgres; losing them on a crash is fine"""
+    __tablename__ = "rate_limits"
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+
+    key = Column(String, primary_key=True)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+class FacetCount(Base):
+    """Active posts per tag / nationality, maintained by app/facets.py"""
+    __tablename__ = "facet_counts"
+
+    facet = Column(String(20), primary_key=True)  # "tag" or "nationality"
+    value = Column(String, primary_key=True)  # as wide as a posts.tags element
+    count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,287 @@
+"""
+Page Cache - Short-lived shared cache for the anonymous parts of public pages
+plus ETag / Last-Modified handling.
+
+Only query results that are the same for every visitor are cached here.
+Per-visitor bits (identity, liked state) are computed on each request and
+folded into the ETag, so a 304 or a cached page never leaks between visitors.
+Every ETag also carries a token for the deployed templates and assets, so a
+deploy never revalidates the previous build's HTML.
+
+Keys include client input (search queries, page cursors), so the cache is
+bounded by bytes as well as entries, and posts are kept as plain dicts
+without their legacy inline image.
+"""
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Tuple
+from fastapi import Request, Response
+from .startup import TEMPLATE_DIR
+from .static_assets import STATIC_DIR, DIST_DIRNAME, MANIFEST_NAME
+
+PAGE_CACHE_TTL = float(os.getenv("PAGE_CACHE_TTL", "5"))  # seconds
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv("PAGE_CACHE_MAX_ENTRIES", "512"))
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+
+def approx_size(value: Any) -> int:
+    """Rough in-memory size of a cached value, for the byte budget"""
+    if isinstance(value, (str, bytes)):
+        return 49 + len(value)
+    if isinstance(value, dict):
+        return 64 + sum(approx_size(k) + approx_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return 56 + sum(approx_size(item) for item in value)
+    return 32
+
+
+class MicroCache:
+    """
+    TTL + LRU cache. Concurrent misses for the same key share one loader call,
+    so a viral post costs one query per TTL window per worker.
+    Expired entries are dropped on every lookup rather than left for the LRU.
+    """
+
+    def __init__(self, ttl: float = PAGE_CACHE_TTL, max_entries: int = PAGE_CACHE_MAX_ENTRIES,
+                 max_bytes: int = PAGE_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (expires_at, value, size)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        # (expires_at, key) in insertion order; with one TTL that is expiry order
+        self._expiry: deque = deque()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _drop(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[2]
+
+    def _evict_expired(self, now: float):
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, key = self._expiry.popleft()
+            entry = self._entries.get(key)
+            # Skip keys that were invalidated or stored again since
+            if entry is not None and entry[0] == expires_at:
+                self._drop(key)
+
+    def _store(self, key: Hashable, value: Any):
+        size = approx_size(value)
+        self._drop(key)
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + self.ttl
+        self._entries[key] = (expires_at, value, size)
+        self._expiry.append((expires_at, key))
+        self.bytes += size
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, _, evicted) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        self._evict_expired(time.monotonic())
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.hits += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Nobody may be waiting; mark the exception as retrieved
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            if self.ttl > 0:
+                self._store(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def invalidate(self, key: Hashable):
+        self._drop(key)
+
+    def invalidate_many(self, keys: Iterable[Hashable]):
+        for key in keys:
+            self._drop(key)
+
+    def clear(self):
+        self._entries.clear()
+        self._expiry.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+page_cache = MicroCache()
+
+
+class CachedPost(dict):
+    """Plain-dict copy of a Post; attribute access keeps templates and render_card working"""
+    __slots__ = ()
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+def cached_post(post) -> CachedPost:
+    """
+    Column values of `post` without image_data - a legacy inline image can
+    be ~68KB, and cards link to /img/post/{id} for it instead.
+    """
+    table = getattr(post, "__table__", None)
+    names = [column.key for column in table.columns] if table is not None else list(vars(post))
+    row = CachedPost((name, getattr(post, name)) for name in names if name != "image_data")
+    row["has_image_data"] = getattr(post, "image_data", None) is not None
+    return row
+
+
+def snapshot(posts: Iterable, dated: bool = False, **extra) -> dict:
+    """
+    Bundle the shared data for a page with its validators.
+    `version` changes whenever anything rendered from these posts changes.
+
+    Last-Modified is only given when `dated` - for a single post. On a list,
+    a post dropping out (blocked, aged out) can leave the newest updated_at
+    the same or lower, so an If-Modified-Since client would get a stale 304;
+    list pages rely on the ETag, which covers membership.
+    """
+    posts = [cached_post(post) for post in posts]
+    digest = hashlib.sha1()
+    last_modified = None
+    for post in posts:
+        digest.update(f"{post.id}:{post.like_count}:{post.status}:{post.moderation_reason}|".encode())
+        changed = post.get("updated_at") or post.created_at
+        if dated and changed and (last_modified is None or changed > last_modified):
+            last_modified = changed
+    for name in sorted(extra):
+        digest.update(f"{name}={extra[name]!r}|".encode())
+    return {
+        "posts": posts,
+        "version": digest.hexdigest(),
+        "last_modified": last_modified,
+        **extra,
+    }
+
+
+def _build_stamp() -> Tuple[str, Optional[datetime]]:
+    """
+    (token, time) of the deployed templates and asset manifest. A deploy that
+    changes either must not be answered with a 304 for the old HTML, which
+    links to static/dist files the build has since deleted.
+    """
+    digest = hashlib.sha1()
+    newest = None
+    for path in [STATIC_DIR / DIST_DIRNAME / MANIFEST_NAME, *sorted(TEMPLATE_DIR.rglob("*.html"))]:
+        try:
+            data = path.read_bytes()
+            modified = path.stat().st_mtime
+        except OSError:
+            continue
+        digest.update(f"{path.name}:{len(data)}|".encode() + data)
+        newest = modified if newest is None else max(newest, modified)
+    built_at = datetime.fromtimestamp(newest, timezone.utc) if newest is not None else None
+    return digest.hexdigest()[:12], built_at
+
+
+# Computed once per process, at startup
+BUILD_TOKEN, BUILD_TIME = _build_stamp()
+
+
+def make_etag(*parts) -> str:
+    """Weak ETag - the markup is equivalent, not byte-identical once compressed"""
+    digest = hashlib.sha1(repr((BUILD_TOKEN,) + parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def _not_before_build(last_modified: Optional[datetime]) -> Optional[datetime]:
+    """The page can't be older than the templates that rendered it"""
+    if last_modified is None or BUILD_TIME is None:
+        return last_modified
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return max(last_modified, BUILD_TIME)
+
+
+def _http_date(dt: datetime) -> str:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return format_datetime(dt.astimezone(timezone.utc), usegmt=True)
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime]) -> dict:
+    headers = {
+        "ETag": etag,
+        # Pages carry the visitor's identity, so only the browser may store them
+        "Cache-Control": "private, no-cache",
+        "Vary": "Cookie",
+    }
+    last_modified = _not_before_build(last_modified)
+    if last_modified is not None:
+        headers["Last-Modified"] = _http_date(last_modified)
+    return headers
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """RFC 9110 precedence: If-None-Match wins over If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        if "*" in candidates:
+            return True
+        # Weak comparison
+        bare = etag.removeprefix("W/")
+        return any(tag.removeprefix("W/") == bare for tag in candidates)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    last_modified = _not_before_build(last_modified)
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def conditional_response(request: Request, etag: str, last_modified: Optional[datetime]) -> Optional[Response]:
+    """Return a 304 if the client's copy is current, else None"""
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=validator_headers(etag, last_modified))
+    return None
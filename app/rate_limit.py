@@ -0,0 +1,149 @@
+"""
+Rate Limiting - Token buckets for the write routes (create post, like).
+Each request spends a token from the visitor's bucket (request.state.user_hash)
+and from its client IP's bucket, so clearing cookies doesn't reset the limit.
+The IP budget is RATE_LIMIT_IP_MULTIPLIER times larger because IPs are shared.
+
+RATE_LIMIT_BACKEND=memory (default) keeps buckets per worker, so the effective
+limit is multiplied by the worker count. RATE_LIMIT_BACKEND=postgres keeps
+them in the UNLOGGED rate_limits table, shared by every worker.
+"""
+import math
+import os
+import random
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from fastapi import HTTPException, Request
+from .metrics import Counter, register
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") != "0"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_IP_MULTIPLIER = int(os.getenv("RATE_LIMIT_IP_MULTIPLIER", "5"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# Render's proxy appends the real client address to X-Forwarded-For
+TRUST_FORWARDED_FOR = os.getenv("TRUST_FORWARDED_FOR", "1") != "0"
+
+
+def _budget(env_name: str, default: str) -> Tuple[float, float]:
+    """"count/seconds" -> (capacity, tokens per second)"""
+    count, seconds = os.getenv(env_name, default).split("/")
+    return float(count), float(count) / float(seconds)
+
+
+# route -> (burst capacity, refill rate per second)
+BUDGETS: Dict[str, Tuple[float, float]] = {
+    "create_post": _budget("RATE_LIMIT_POSTS", "5/600"),
+    "like_post": _budget("RATE_LIMIT_LIKES", "60/60"),
+}
+
+rate_limited = register(Counter(
+    "ihtp_rate_limited_total", "Requests rejected by the rate limiter", ("route", "scope"),
+))
+
+
+class MemoryBuckets:
+    """Per-worker buckets. A bucket idle long enough to refill completely is
+    the same as no bucket, so the least recently used ones are dropped."""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        # key -> [tokens, last refill, seconds until full again]
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+
+    def _expire(self, now: float):
+        while self._buckets:
+            key, (tokens, last, refill_time) = next(iter(self._buckets.items()))
+            if now - last < refill_time and len(self._buckets) <= self.max_keys:
+                break
+            del self._buckets[key]
+
+    async def acquire(self, key: str, capacity: float, rate: float) -> Optional[float]:
+        """Spend one token; returns None on success or seconds until one is available"""
+        now = time.monotonic()
+        bucket = self._buckets.pop(key, None)
+        if bucket is None:
+            tokens = capacity
+        else:
+            tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+
+        retry_after = None
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / rate
+        self._buckets[key] = [tokens, now, (capacity - tokens) / rate]
+        self._expire(now)
+        return retry_after
+
+    def clear(self):
+        self._buckets.clear()
+
+
+class PostgresBuckets:
+    """Buckets shared by all workers; one upsert per check"""
+
+    ACQUIRE = """
+        INSERT INTO rate_limits AS r (key, tokens, updated_at)
+        VALUES (:key, CAST(:capacity AS float8) - 1, now())
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = LEAST(CAST(:capacity AS float8),
+                           r.tokens + EXTRACT(EPOCH FROM now() - r.updated_at)::float8 * :rate) - 1,
+            updated_at = now()
+        WHERE LEAST(CAST(:capacity AS float8),
+                    r.tokens + EXTRACT(EPOCH FROM now() - r.updated_at)::float8 * :rate) >= 1
+        RETURNING tokens
+    """
+    # Rows idle this long have refilled under any budget and can go
+    EXPIRE = "DELETE FROM rate_limits WHERE updated_at < now() - interval '1 day'"
+
+    async def acquire(self, key: str, capacity: float, rate: float) -> Optional[float]:
+        from sqlalchemy import text
+        from .database import get_engine
+
+        async with get_engine().begin() as conn:
+            result = await conn.execute(text(self.ACQUIRE), {"key": key, "capacity": capacity, "rate": rate})
+            allowed = result.first() is not None
+            if random.random() < 0.001:
+                await conn.execute(text(self.EXPIRE))
+        return None if allowed else 1 / rate
+
+    def clear(self):
+        pass
+
+
+buckets = PostgresBuckets() if RATE_LIMIT_BACKEND == "postgres" else MemoryBuckets()
+
+
+def client_ip(request: Request) -> str:
+    if TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            # The last hop is the one our proxy added; earlier ones are client-supplied
+            return forwarded.rsplit(",", 1)[-1].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def rate_limit(route: str):
+    """Dependency that rejects the request with 429 once the budget is spent"""
+    capacity, rate = BUDGETS[route]
+
+    async def check(request: Request):
+        if not RATE_LIMIT_ENABLED:
+            return
+        checks = (
+            ("visitor", f"{route}:u:{request.state.user_hash}", capacity, rate),
+            ("ip", f"{route}:ip:{client_ip(request)}",
+             capacity * RATE_LIMIT_IP_MULTIPLIER, rate * RATE_LIMIT_IP_MULTIPLIER),
+        )
+        for scope, key, bucket_capacity, bucket_rate in checks:
+            retry_after = await buckets.acquire(key, bucket_capacity, bucket_rate)
+            if retry_after is not None:
+                rate_limited.inc(route, scope)
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many requests, slow down",
+                    headers={"Retry-After": str(math.ceil(retry_after))},
+                )
+
+    return check
@@ -0,0 +1,150 @@
+"""
+Like Count Reconciliation - posts.like_count is updated read-modify-write in
+like_post and drifts under concurrency. This job recounts only posts with like
+activity since the last run and fixes the ones that are off, in small batches.
+
+Runs every RECONCILE_INTERVAL seconds inside the app (0 disables), guarded by
+an advisory lock so only one worker does the work, or once from the shell:
+    python -m app.reconcile --since-hours 24
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import text
+from .hot import hot_score_sql, fill_missing_scores
+from .metrics import Counter, register
+
+RECONCILE_INTERVAL = float(os.getenv("RECONCILE_INTERVAL", "300"))
+RECONCILE_BATCH_SIZE = int(os.getenv("RECONCILE_BATCH_SIZE", "200"))
+# How far back the first run after boot looks
+RECONCILE_LOOKBACK = float(os.getenv("RECONCILE_LOOKBACK", "3600"))
+# created_at is the inserting transaction's start time, so a like can commit
+# with a timestamp slightly older than the watermark; re-scan this much
+WATERMARK_OVERLAP = timedelta(seconds=60)
+ADVISORY_LOCK_ID = 7301
+
+corrections_total = register(Counter(
+    "ihtp_like_count_corrections_total", "Posts whose like_count the reconciler fixed",
+))
+
+# Unlikes delete their row, so posts.updated_at (bumped by every like_post)
+# catches the posts that likes.created_at alone would miss
+CANDIDATES = text("""
+    SELECT post_id FROM likes WHERE created_at > :since
+    UNION
+    SELECT id FROM posts WHERE updated_at > :since
+""")
+
+FIX_BATCH = text(f"""
+    UPDATE posts p SET like_count = c.n, hot_score = {hot_score_sql('c.n', 'p.created_at')}, updated_at = now()
+    FROM (
+        SELECT p2.id, COUNT(l.post_id) AS n
+        FROM posts p2 LEFT JOIN likes l ON l.post_id = p2.id
+        WHERE p2.id = ANY(:ids)
+        GROUP BY p2.id
+    ) c
+    WHERE p.id = c.id AND p.like_count IS DISTINCT FROM c.n
+    RETURNING p.id
+""")
+
+_watermark: Optional[datetime] = None
+
+
+async def reconcile_like_counts(engine, since: datetime, batch_size: int = RECONCILE_BATCH_SIZE) -> dict:
+    """Recount posts touched since `since`. Returns checked/corrected/skipped and the new watermark."""
+    async with engine.connect() as conn:
+        now = (await conn.execute(text("SELECT now()"))).scalar()
+        ids: List = [row[0] for row in await conn.execute(CANDIDATES, {"since": since - WATERMARK_OVERLAP})]
+
+    corrected: List = []
+    skipped = 0
+    for i in range(0, len(ids), batch_size):
+        batch = ids[i:i + batch_size]
+        try:
+            # One short transaction per batch; give up on a batch rather than
+            # queue behind a like that holds the row
+            async with engine.begin() as conn:
+                await conn.execute(text("SET LOCAL lock_timeout = '2s'"))
+                result = await conn.execute(FIX_BATCH, {"ids": batch})
+                corrected.extend(row[0] for row in result)
+        except Exception as e:
+            skipped += len(batch)
+            print(f"Reconcile: batch skipped ({e.__class__.__name__}: {e})")
+
+    corrections_total.inc(amount=len(corrected))
+    return {"checked": len(ids), "corrected": corrected, "skipped": skipped,
+            "watermark": now if not skipped else since}
+
+
+async def run_once(engine) -> Optional[dict]:
+    """One pass if no other worker holds the lock; advances the watermark"""
+    global _watermark
+    async with engine.connect() as lock_conn:
+        locked = (await lock_conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": ADVISORY_LOCK_ID})).scalar()
+        if not locked:
+            return None
+        try:
+            if _watermark is None:
+                _watermark = (await lock_conn.execute(text("SELECT now()"))).scalar() - timedelta(seconds=RECONCILE_LOOKBACK)
+            await lock_conn.commit()
+            start = time.perf_counter()
+            report = await reconcile_like_counts(engine, _watermark)
+            _watermark = report["watermark"]
+            report["scored"] = await fill_missing_scores(engine)
+        finally:
+            await lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": ADVISORY_LOCK_ID})
+            await lock_conn.commit()
+
+    if report["corrected"]:
+        # Card fragments are keyed on like_count and miss on their own
+        from .page_cache import page_cache
+        for post_id in report["corrected"]:
+            page_cache.invalidate(("post", post_id))
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"Reconcile: {report['checked']} posts checked, {len(report['corrected'])} corrected, "
+          f"{report['skipped']} skipped, {report['scored']} newly scored in {elapsed:.0f}ms")
+    return report
+
+
+async def reconcile_forever(engine_factory):
+    while True:
+        # Jitter so both workers don't wake at the same moment
+        await asyncio.sleep(RECONCILE_INTERVAL * random.uniform(0.9, 1.1))
+        try:
+            await run_once(engine_factory())
+        except Exception as e:
+            print(f"Reconcile failed: {e.__class__.__name__}: {e}")
+
+
+def start_reconciler(engine_factory) -> Optional[asyncio.Task]:
+    if RECONCILE_INTERVAL <= 0:
+        return None
+    return asyncio.create_task(reconcile_forever(engine_factory))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recount like_count for recently liked posts")
+    parser.add_argument("--since-hours", type=float, default=24, help="look at likes from this far back")
+    parser.add_argument("--batch-size", type=int, default=RECONCILE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    async def run():
+        from .database import get_engine
+        engine = get_engine()
+        async with engine.connect() as conn:
+            now = (await conn.execute(text("SELECT now()"))).scalar()
+        report = await reconcile_like_counts(engine, now - timedelta(hours=args.since_hours), args.batch_size)
+        scored = await fill_missing_scores(engine)
+        print(f"✓ {report['checked']} posts checked, {len(report['corrected'])} corrected, "
+              f"{report['skipped']} skipped, {scored} newly scored")
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
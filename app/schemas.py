@@ -1,3 +1,4 @@
+import os
 from pydantic import BaseModel, Field, HttpUrl
 from typing import List, Optional
 from datetime import datetime
@@ -24,3 +25,17 @@ class PostResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+# Lives here rather than in image_resolver, which imports httpx at module level
+BATCH_MAX_URLS = int(os.getenv("RESOLVE_BATCH_MAX_URLS", "50"))
+
+class ResolveBatchRequest(BaseModel):
+    urls: List[str] = Field(..., min_length=1, max_length=BATCH_MAX_URLS)
+
+class ResolveBatchItem(BaseModel):
+    original: str
+    resolved: Optional[str] = None
+    status: str
+
+class ResolveBatchResponse(BaseModel):
+    results: List[ResolveBatchItem]
@@ -0,0 +1,121 @@
+"""
+Slow Query Log - Records statements slower than SLOW_QUERY_MS with the route
+that ran them, the shape of their parameters and (sampled) their EXPLAIN plan.
+Off unless SLOW_QUERY_MS is set. Entries live in a per-worker ring buffer
+shown at /admin/slow-queries.
+"""
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import List
+from .metrics import request_scope, route_label
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+# Fraction of slow statements that also get an EXPLAIN capture
+SLOW_QUERY_EXPLAIN_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_RATE", "0.1"))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "100"))
+EXPLAIN_TIMEOUT_MS = int(os.getenv("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", "5000"))
+
+_log: deque = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+# The in-flight EXPLAIN task, referenced so it isn't garbage collected
+_capture_task = None
+
+
+def parameter_shape(parameters, executemany: bool) -> str:
+    """Types of the bound parameters, never their values"""
+    if executemany:
+        rows = list(parameters or [])
+        return f"{len(rows)} x ({parameter_shape(rows[0], False)})" if rows else "0 rows"
+    if not parameters:
+        return ""
+    if isinstance(parameters, dict):
+        items = parameters.values()
+    else:
+        items = parameters
+    shape = []
+    for value in items:
+        if isinstance(value, (list, tuple)):
+            shape.append(f"{type(value).__name__}[{len(value)}]")
+        else:
+            shape.append(type(value).__name__)
+    return ", ".join(shape)
+
+
+def entries() -> List[dict]:
+    """Newest first"""
+    return list(reversed(_log))
+
+
+def clear():
+    _log.clear()
+
+
+async def capture_plan(engine, entry: dict, statement: str, parameters):
+    """Run EXPLAIN on a separate connection and attach the plan to `entry`"""
+    # ANALYZE executes the statement, so writes only get the estimated plan
+    if statement.lstrip()[:6].upper() == "SELECT":
+        prefix = "EXPLAIN (ANALYZE, BUFFERS)"
+    else:
+        prefix = "EXPLAIN"
+    try:
+        async with engine.connect() as conn:
+            await conn.exec_driver_sql(f"SET LOCAL statement_timeout = {EXPLAIN_TIMEOUT_MS}")
+            result = await conn.exec_driver_sql(f"{prefix} {statement}", parameters or None)
+            entry["plan"] = "\n".join(row[0] for row in result.fetchall())
+            # Leaving the block rolls back, so nothing the EXPLAIN touched is kept
+    except Exception as e:
+        entry["plan"] = f"EXPLAIN failed: {e.__class__.__name__}: {e}"
+
+
+def instrument_slow_queries(engine):
+    """Hook the engine so statements over SLOW_QUERY_MS are logged"""
+    from sqlalchemy import event
+
+    sync_engine = engine.sync_engine
+    threshold = SLOW_QUERY_MS / 1000
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        global _capture_task
+        starts = conn.info.get("slow_query_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        if elapsed < threshold or statement.startswith(("EXPLAIN", "SET LOCAL")):
+            return
+
+        scope = request_scope.get()
+        entry = {
+            "at": datetime.now(timezone.utc),
+            "duration_ms": round(elapsed * 1000, 1),
+            "route": f"{scope['method']} {route_label(scope)}" if scope else "background",
+            "statement": statement,
+            "parameters": parameter_shape(parameters, executemany),
+            "plan": None,
+        }
+        _log.append(entry)
+        print(f"Slow query ({entry['duration_ms']}ms) in {entry['route']}: {statement[:120]!r}")
+
+        # One capture at a time per worker, and only for a sample of statements
+        busy = _capture_task is not None and not _capture_task.done()
+        if executemany or busy or random.random() >= SLOW_QUERY_EXPLAIN_RATE:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        entry["plan"] = "capturing..."
+        _capture_task = loop.create_task(capture_plan(engine, entry, statement, parameters))
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(context):
+        starts = context.connection.info.get("slow_query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
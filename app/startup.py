@@ -0,0 +1,90 @@
+"""
+Startup - Cold start optimizations for Render, where idle instances spin down.
+With FAST_STARTUP on (the default), compiled templates are read from a
+bytecode cache that build_assets.py fills during the build, and the lifespan
+warm-up precompiles every template and opens a few pool connections before
+the first request arrives.
+"""
+import asyncio
+import os
+import time
+from pathlib import Path
+from jinja2 import FileSystemBytecodeCache
+from sqlalchemy import text
+
+FAST_STARTUP = os.getenv("FAST_STARTUP", "1") != "0"
+BASE_DIR = Path(__file__).resolve().parent.parent
+TEMPLATE_DIR = BASE_DIR / "templates"
+# Inside the deployed checkout, not /tmp: Render wipes /tmp when an idle
+# instance spins down, which is exactly the cold start this cache is for
+TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR", str(BASE_DIR / ".jinja_cache"))
+WARMUP_DB_CONNECTIONS = int(os.getenv("WARMUP_DB_CONNECTIONS", "2"))
+WARMUP_DB_TIMEOUT = float(os.getenv("WARMUP_DB_TIMEOUT", "5"))
+
+
+def configure_templates(env):
+    """Attach the persistent bytecode cache. Call before any template is loaded."""
+    if not FAST_STARTUP:
+        return
+    try:
+        os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+        env.bytecode_cache = FileSystemBytecodeCache(TEMPLATE_CACHE_DIR)
+    except OSError as e:
+        print(f"Template cache disabled: {e}")
+
+
+def precompile_templates(env) -> int:
+    count = 0
+    for name in env.list_templates(extensions=["html"]):
+        env.get_template(name)
+        count += 1
+    return count
+
+
+def build_template_cache() -> int:
+    """
+    Compile every template into TEMPLATE_CACHE_DIR, for the build step.
+    Uses the same Jinja2Templates setup as app.main, since cache entries are
+    keyed by template path and don't record environment options.
+    """
+    from fastapi.templating import Jinja2Templates
+
+    templates = Jinja2Templates(directory=str(TEMPLATE_DIR))
+    os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+    cache = FileSystemBytecodeCache(TEMPLATE_CACHE_DIR)
+    cache.clear()
+    templates.env.bytecode_cache = cache
+    return precompile_templates(templates.env)
+
+
+async def open_pool_connections(engine, count: int):
+    """Check out `count` connections at once so they all land in the pool"""
+    async def touch():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            # Hold the connection until every other one is open too
+            await barrier.wait()
+
+    barrier = asyncio.Barrier(count)
+    await asyncio.gather(*(touch() for _ in range(count)))
+
+
+async def warm_up(env, engine_factory):
+    if not FAST_STARTUP:
+        return
+    start = time.perf_counter()
+    compiled = precompile_templates(env)
+
+    opened = 0
+    if WARMUP_DB_CONNECTIONS > 0:
+        try:
+            await asyncio.wait_for(
+                open_pool_connections(engine_factory(), WARMUP_DB_CONNECTIONS), WARMUP_DB_TIMEOUT
+            )
+            opened = WARMUP_DB_CONNECTIONS
+        except Exception as e:
+            # A slow or missing database must not keep the app from booting
+            print(f"Warm-up: database not reachable ({e.__class__.__name__}: {e})")
+
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"Warm-up: {compiled} templates, {opened} DB connections in {elapsed:.0f}ms")
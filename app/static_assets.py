@@ -0,0 +1,99 @@
+"""
+Static Assets - Fingerprinted, precompressed files built by build_assets.py
+Templates reference assets through asset_url(), which maps a source path to
+its fingerprinted copy when a manifest exists (and to the plain file in dev).
+"""
+import json
+import mimetypes
+from pathlib import Path
+from typing import Dict, Set
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import Response
+from starlette.types import Scope
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+DIST_DIRNAME = "dist"
+MANIFEST_NAME = "manifest.json"
+
+# Fingerprinted files never change, so browsers may keep them for a year
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Order of preference when a client accepts several encodings
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+def accepted_encodings(accept_encoding: str) -> Set[str]:
+    """Content-codings from an Accept-Encoding header, minus any with q=0"""
+    encodings = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        encodings.add(coding.strip())
+    return encodings
+
+
+def load_manifest(static_dir: Path = STATIC_DIR) -> Dict[str, str]:
+    manifest_path = static_dir / DIST_DIRNAME / MANIFEST_NAME
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+_manifest = load_manifest()
+
+
+def asset_url(path: str) -> str:
+    """
+    URL for a file under static/.
+    Usage in templates: {{ asset_url('css/styles.css') }}
+    """
+    path = path.lstrip("/")
+    return "/static/" + _manifest.get(path, path)
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves the .br/.gz sibling of a fingerprinted file when the
+    client accepts it, and marks fingerprinted files as immutable.
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if not path.startswith(DIST_DIRNAME + "/"):
+            return await super().get_response(path, scope)
+
+        accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        response = None
+        for encoding, suffix in PRECOMPRESSED:
+            if encoding not in accepted:
+                continue
+            try:
+                response = await super().get_response(path + suffix, scope)
+            except HTTPException:
+                continue
+            if response.status_code == 200:
+                media_type, _ = mimetypes.guess_type(path)
+                media_type = media_type or "application/octet-stream"
+                if media_type.startswith("text/") or media_type == "application/javascript":
+                    media_type += "; charset=utf-8"
+                response.headers["content-type"] = media_type
+                response.headers["content-encoding"] = encoding
+            break
+
+        if response is None:
+            response = await super().get_response(path, scope)
+
+        if response.status_code in (200, 304):
+            response.headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+            response.headers["vary"] = "Accept-Encoding"
+        return response
@@ -0,0 +1,115 @@
+"""
+Uploads - Intake for POST /posts images.
+The request body is capped while it streams in, the image is validated from
+its header before decoding, and it is looked up before compressing, so a
+re-uploaded meme skips compression and points at the already stored copy.
+Dedup is exact: only the same decoded pixels count as the same image. A
+re-encoded or resized copy is stored again, and a different caption on the
+same template can never be merged with another user's picture.
+"""
+import base64
+import os
+from typing import Optional, Tuple
+from uuid import UUID
+from fastapi import Response
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .image_processor import MAX_UPLOAD_SIZE, open_upload, content_digest, compress_image
+from .metrics import Counter, register
+from .models import Image
+
+# Room for the text fields and multipart boundaries next to the image
+FORM_OVERHEAD = int(os.getenv("UPLOAD_FORM_OVERHEAD", str(64 * 1024)))
+MAX_REQUEST_SIZE = MAX_UPLOAD_SIZE + FORM_OVERHEAD
+
+image_dedup = register(Counter(
+    "ihtp_image_dedup_total", "Uploads matched to an already stored image", ("result",),
+))
+
+
+class BodySizeLimitMiddleware:
+    """Pure ASGI cap on request bodies for upload routes. Rejects on
+    Content-Length up front, and counts bytes for chunked bodies."""
+
+    def __init__(self, app: ASGIApp, limits: Optional[dict] = None):
+        self.app = app
+        # (method, path) -> max body bytes
+        self.limits = limits if limits is not None else {("POST", "/posts"): MAX_REQUEST_SIZE}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        limit = self.limits.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if value.isdigit() and int(value) > limit:
+                    response = Response("Upload too large", status_code=413)
+                    await response(scope, receive, send)
+                    return
+                break
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # FastAPI re-raises HTTPException from body parsing as-is
+                    raise HTTPException(status_code=413, detail="Upload too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+async def find_image(db: AsyncSession, digest: str) -> Optional[UUID]:
+    """Stored image with exactly these pixels"""
+    result = await db.execute(select(Image.id).where(Image.digest == digest))
+    return result.scalar_one_or_none()
+
+
+async def store_image(db: AsyncSession, data: str, digest: str, size: Tuple[int, int]) -> UUID:
+    """Insert, or return the row a concurrent upload of the same image won with"""
+    stmt = insert(Image).values(data=data, digest=digest, width=size[0], height=size[1])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Image.digest], set_={"digest": stmt.excluded.digest}
+    ).returning(Image.id)
+    result = await db.execute(stmt)
+    return result.scalar_one()
+
+
+async def ingest_upload(db: AsyncSession, upload) -> Tuple[Optional[UUID], Optional[str]]:
+    """Returns (image_id, error_message) for an UploadFile"""
+    # Decoding and compressing are CPU work; keep them off the event loop.
+    # upload.file is the spooled temp file, so nothing is copied into memory first
+    img, error = await run_in_threadpool(open_upload, upload.file, upload.size)
+    if error:
+        return None, error
+
+    digest = await run_in_threadpool(content_digest, img)
+    image_id = await find_image(db, digest)
+    if image_id is not None:
+        image_dedup.inc("hit")
+        return image_id, None
+
+    image_dedup.inc("miss")
+    data, error = await run_in_threadpool(compress_image, img)
+    if error:
+        return None, error
+    return await store_image(db, data, digest, img.size), None
+
+
+def image_response(data: str) -> Response:
+    # Images are immutable and addressed by id, so browsers keep them forever
+    return Response(
+        content=base64.b64decode(data),
+        media_type="image/jpeg",
+        headers={"Cache-Control": "public, max-age=31536000, immutable"},
+    )
@@ -0,0 +1,87 @@
+"""
+Cold start benchmark - time from process launch to the first successful
+response, the way a Render instance waking from idle experiences it.
+
+Spawns `uvicorn app.main:app` for each run and polls until PATH answers 200.
+Runs with FAST_STARTUP=0 and =1 so the two can be compared.
+
+Pass --app-dir to time another checkout (e.g. a `git worktree` of an older
+commit) with the same interpreter.
+
+Usage: python -m benchmarks.bench_cold_start [--path /create] [--runs 5] [--app-dir DIR]
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import httpx
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_response(path: str, fast_startup: bool, app_dir: str = ".", timeout: float = 60.0):
+    """Returns (seconds to first 200, seconds for the second request)"""
+    port = free_port()
+    env = dict(os.environ, FAST_STARTUP="1" if fast_startup else "0")
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, cwd=app_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}{path}"
+    try:
+        with httpx.Client(timeout=5.0) as client:
+            while True:
+                if time.perf_counter() - start > timeout:
+                    raise TimeoutError(f"no response from {url} within {timeout}s")
+                if proc.poll() is not None:
+                    raise RuntimeError(f"server exited with code {proc.returncode}")
+                try:
+                    response = client.get(url)
+                except httpx.TransportError:
+                    time.sleep(0.01)
+                    continue
+                if response.status_code == 200:
+                    first = time.perf_counter() - start
+                    break
+                raise RuntimeError(f"{url} answered {response.status_code}")
+
+            second_start = time.perf_counter()
+            client.get(url).raise_for_status()
+            second = time.perf_counter() - second_start
+        return first, second
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--path", default="/create")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--app-dir", default=".")
+    args = parser.parse_args()
+
+    print(f"{'FAST_STARTUP':<14}{'first (ms) p50':>16}{'min':>8}{'max':>8}{'second (ms)':>14}")
+    # The build step fills the bytecode cache, as a deploy does; no warm launch
+    # beforehand, so nothing a real cold start lacks is already in place
+    subprocess.run([sys.executable, "build_assets.py"], cwd=args.app_dir, check=True, stdout=subprocess.DEVNULL)
+    for fast in (False, True):
+        runs = [time_to_first_response(args.path, fast, args.app_dir) for _ in range(args.runs)]
+        firsts = [r[0] * 1000 for r in runs]
+        seconds = [r[1] * 1000 for r in runs]
+        print(
+            f"{'1' if fast else '0':<14}{statistics.median(firsts):>16.0f}{min(firsts):>8.0f}"
+            f"{max(firsts):>8.0f}{statistics.median(seconds):>14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Compression report - bytes on the wire per route with and without
+CompressionMiddleware's negotiated encodings.
+
+By default runs in-process against synthetic posts (no database needed).
+Pass --base-url to measure a running deployment instead.
+
+Usage: python -m benchmarks.bench_compression [--posts 50] [--base-url http://localhost:8000]
+"""
+import argparse
+import asyncio
+import base64
+import os
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+import httpx
+from app.admin_auth import create_access_token
+from app.models import Post
+
+ENCODINGS = ["identity", "gzip", "br"]
+
+
+class SyntheticSession:
+    """Just enough of AsyncSession for the read routes and the htmx fragments"""
+
+    def __init__(self, posts: List[Post]):
+        self.posts = posts
+
+    async def execute(self, statement, params=None):
+        return _Result(self.posts if "FROM posts" in str(statement) else [])
+
+    def add(self, obj):
+        pass
+
+    async def commit(self):
+        pass
+
+    async def refresh(self, obj):
+        pass
+
+
+class _Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+    def scalar_one_or_none(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return [(row.id,) for row in self.rows]
+
+
+def synthetic_posts(count: int) -> List[Post]:
+    rng = random.Random(42)
+    now = datetime.now(timezone.utc)
+    tags = ["politics", "work", "ex", "neighbour", "celebrity", "gaming"]
+    posts = []
+    for i in range(count):
+        # Stored images are ~5-50KB JPEGs, i.e. incompressible bytes
+        image = base64.b64encode(os.urandom(rng.randint(5_000, 50_000))).decode()
+        posts.append(Post(
+            id=uuid.uuid4(), image_data=image, title=f"Person number {i}",
+            description="Talks loudly on the phone in the quiet carriage every single morning.",
+            reason="Because some people simply never learn how to behave in public.",
+            tags=rng.sample(tags, 2), nationality=rng.choice(["US", "GB", "DE", "FR"]),
+            created_at=now - timedelta(hours=i), updated_at=now - timedelta(hours=i),
+            author_hash=uuid.uuid4().hex, like_count=rng.randint(0, 500), status="active",
+        ))
+    return posts
+
+
+async def measure(client: httpx.AsyncClient, method: str, path: str, encoding: str, data=None) -> int:
+    headers = {"Accept-Encoding": encoding}
+    response = await client.request(method, path, headers=headers, data=data)
+    response.raise_for_status()
+    return response.num_bytes_downloaded
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--posts", type=int, default=50)
+    parser.add_argument("--base-url", default=None)
+    args = parser.parse_args()
+
+    post_id: Optional[str] = None
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url)
+    else:
+        from app.database import get_db, get_read_db
+        from app.main import app
+
+        posts = synthetic_posts(args.posts)
+        post_id = str(posts[0].id)
+
+        async def synthetic_db():
+            yield SyntheticSession(posts)
+
+        app.dependency_overrides[get_db] = synthetic_db
+        # The public pages read through the replica dependency
+        app.dependency_overrides[get_read_db] = synthetic_db
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+    client.cookies.set("admin_token", create_access_token({"admin": True}))
+    routes = [
+        ("GET", "/", None),
+        ("GET", "/leaderboard", None),
+        ("GET", "/search?q=person", None),
+        ("GET", "/create", None),
+    ]
+    if post_id:
+        routes += [
+            ("GET", f"/post/{post_id}", None),
+            ("POST", f"/posts/{post_id}/like", None),
+            ("GET", "/admin", None),
+            ("POST", f"/admin/posts/{post_id}/block", {"reason": "spam"}),
+        ]
+
+    async with client:
+        print(f"{'route':<62}" + "".join(f"{e:>10}" for e in ENCODINGS) + f"{'saved':>8}")
+        for method, path, data in routes:
+            sizes = [await measure(client, method, path, e, data) for e in ENCODINGS]
+            best = min(sizes[1:])
+            saved = 1 - best / sizes[0] if sizes[0] else 0
+            label = f"{method} {path}"
+            print(f"{label:<62}" + "".join(f"{s:>10}" for s in sizes) + f"{saved:>8.0%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,211 @@
+"""
+Route benchmark - drives each route with a concurrent async load generator
+and reports latency percentiles and throughput as JSON.
+
+Seed first (python -m benchmarks.seed_data), then either point this at a
+running server with --base-url or leave it out to drive app.main in-process
+against DATABASE_URL. Every virtual user keeps its own anon_id cookie, so
+like_post toggles real per-visitor likes.
+
+All virtual users share one client IP, which would exhaust like_post's IP
+rate-limit bucket and turn most likes into 429s. The in-process run turns
+rate limiting off; start a server under test with RATE_LIMIT_ENABLED=0.
+
+Usage:
+    python -m benchmarks.bench_routes --base-url http://localhost:8000 \\
+        --concurrency 20 --requests 500 --output bench-$(git rev-parse --short HEAD).json
+    python -m benchmarks.bench_routes ... --compare bench-abc1234.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+import httpx
+
+POST_ID_PATTERN = re.compile(r"/posts/([0-9a-f-]{36})/like")
+SEARCH_TERMS = ["boss", "neighbour", "politics", "loud", "gaming", "landlord", "nobodymatchesthis"]
+
+# name -> (method, path builder)
+ROUTES: Dict[str, tuple] = {
+    "read_root": ("GET", lambda rng, ids: "/"),
+    "leaderboard_page": ("GET", lambda rng, ids: "/leaderboard"),
+    "view_post": ("GET", lambda rng, ids: f"/post/{rng.choice(ids)}"),
+    "search_posts": ("GET", lambda rng, ids: f"/search?q={rng.choice(SEARCH_TERMS)}"),
+    "like_post": ("POST", lambda rng, ids: f"/posts/{rng.choice(ids)}/like"),
+}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def discover_post_ids(client: httpx.AsyncClient) -> List[str]:
+    ids = set()
+    for path in ("/", "/leaderboard"):
+        response = await client.get(path)
+        response.raise_for_status()
+        ids.update(POST_ID_PATTERN.findall(response.text))
+    return sorted(ids)
+
+
+async def drive_route(
+    client_factory: Callable[[], httpx.AsyncClient],
+    method: str,
+    build_path: Callable,
+    post_ids: List[str],
+    total: int,
+    concurrency: int,
+    seed: int,
+) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    remaining = total
+
+    async def virtual_user(user_index: int):
+        nonlocal remaining, errors
+        rng = random.Random(seed * 1000 + user_index)
+        async with client_factory() as client:
+            # First request hands out this user's anon_id cookie
+            await client.get("/create")
+            while remaining > 0:
+                remaining -= 1
+                path = build_path(rng, post_ids)
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, path)
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                elapsed = time.perf_counter() - start
+                if ok:
+                    latencies.append(elapsed * 1000)
+                else:
+                    errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(virtual_user(i) for i in range(concurrency)))
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "concurrency": concurrency,
+        "throughput_rps": round(len(latencies) / wall, 1) if wall else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+    }
+
+
+async def run(args) -> dict:
+    if args.base_url:
+        def client_factory():
+            return httpx.AsyncClient(base_url=args.base_url, timeout=30.0)
+    else:
+        from app import rate_limit
+        from app.main import app
+        rate_limit.RATE_LIMIT_ENABLED = False
+        transport = httpx.ASGITransport(app=app)
+
+        def client_factory():
+            return httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=30.0)
+
+    async with client_factory() as client:
+        post_ids = await discover_post_ids(client)
+    if not post_ids:
+        raise SystemExit("No posts found - run `python -m benchmarks.seed_data` first")
+
+    selected = args.routes or list(ROUTES)
+    results = {}
+    for name in selected:
+        method, build_path = ROUTES[name]
+        # Warm caches and connection pools so the numbers reflect steady state
+        await drive_route(client_factory, method, build_path, post_ids, args.warmup, args.concurrency, args.seed)
+        results[name] = await drive_route(
+            client_factory, method, build_path, post_ids, args.requests, args.concurrency, args.seed
+        )
+        print(
+            f"{name:<18} p50 {results[name]['p50_ms']:>8.1f}ms  p95 {results[name]['p95_ms']:>8.1f}ms  "
+            f"p99 {results[name]['p99_ms']:>8.1f}ms  {results[name]['throughput_rps']:>8.1f} req/s",
+            file=sys.stderr,
+        )
+
+    return {
+        "revision": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "target": args.base_url or "in-process",
+        "python": platform.python_version(),
+        "config": {
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "post_ids_sampled": len(post_ids),
+        },
+        "routes": results,
+    }
+
+
+def compare(previous: dict, current: dict):
+    """Print per-route change against an earlier report"""
+    print(f"vs {previous.get('revision')} ({previous.get('target')})", file=sys.stderr)
+    for name, now in current["routes"].items():
+        before = previous.get("routes", {}).get(name)
+        if not before:
+            continue
+        deltas = []
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            change = (now[metric] - before[metric]) / before[metric] if before[metric] else 0.0
+            deltas.append(f"{metric} {change:+.1%}")
+        print(f"{name:<18} " + "  ".join(deltas), file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default=None, help="running server; default drives app.main in-process")
+    parser.add_argument("--requests", type=int, default=500, help="measured requests per route")
+    parser.add_argument("--warmup", type=int, default=50, help="unmeasured requests per route")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--routes", nargs="*", choices=list(ROUTES), help="subset of routes to run")
+    parser.add_argument("--output", default=None, help="write JSON here instead of stdout")
+    parser.add_argument("--compare", default=None, help="earlier JSON report to diff against")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload + "\n")
+        print(f"✓ Wrote {args.output}", file=sys.stderr)
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
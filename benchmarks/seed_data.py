@@ -0,0 +1,160 @@
+"""
+Synthetic data generator - seeds the database at DATABASE_URL with N posts
+and M likes for benchmarking. The same --seed always produces the same data,
+so runs on different commits are comparable.
+
+Images go into the images table the way uploads do: random bytes
+base64-encoded at the sizes compress_image produces (a few KB up to its 50KB
+target), with a share of posts reusing an earlier image like a deduplicated
+re-upload. Posts point at them through image_id, as new posts do.
+Likes follow a long-tail distribution, and like_count matches the likes table.
+
+Usage: python -m benchmarks.seed_data --posts 5000 --likes 50000 [--reset]
+"""
+import argparse
+import asyncio
+import base64
+import random
+import time
+import uuid
+from itertools import accumulate
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import insert, text
+from app.database import Base, get_engine
+from app.hot import hot_score
+from app.facets import rebuild_facets
+from app.image_processor import TARGET_SIZE
+from app.models import Post, Like, Image
+
+TAGS = ["politics", "work", "ex", "neighbour", "celebrity", "gaming", "school", "sports", "family", "online"]
+NATIONALITIES = ["US", "GB", "DE", "FR", "IN", "BR", "CA", "AU", "JP", "MX", "NL", "SE"]
+WORDS = (
+    "always never loud rude late boss neighbour driver streamer coworker landlord "
+    "cousin referee influencer roommate teacher barista cyclist parker talker"
+).split()
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1", "postgres", "db"}
+BATCH_SIZE = 500
+# Share of posts whose upload matched an already stored image
+REUSED_IMAGE_RATE = 0.1
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def make_image(rng: random.Random) -> dict:
+    width = rng.randint(200, 400)
+    return {
+        "id": uuid.UUID(int=rng.getrandbits(128), version=4),
+        "data": base64.b64encode(rng.randbytes(rng.randint(3 * 1024, TARGET_SIZE))).decode(),
+        "digest": f"{rng.getrandbits(256):064x}",
+        "width": width,
+        "height": 200,
+    }
+
+
+def make_posts(rng: random.Random, count: int, days: int, images: list):
+    """Yields post rows; appends the images they use to `images`"""
+    now = datetime.now(timezone.utc)
+    for i in range(count):
+        created = now - timedelta(seconds=rng.uniform(0, days * 86400))
+        image_id = None
+        if rng.random() < 0.95:
+            if images and rng.random() < REUSED_IMAGE_RATE:
+                image_id = rng.choice(images)["id"]
+            else:
+                images.append(make_image(rng))
+                image_id = images[-1]["id"]
+        yield {
+            "id": uuid.UUID(int=rng.getrandbits(128), version=4),
+            "image_id": image_id,
+            "title": sentence(rng, rng.randint(2, 5))[:50],
+            "description": sentence(rng, rng.randint(5, 20))[:180] if rng.random() < 0.8 else None,
+            "reason": sentence(rng, rng.randint(5, 30))[:250] if rng.random() < 0.7 else None,
+            "tags": rng.sample(TAGS, rng.randint(0, 2)),
+            "nationality": rng.choice(NATIONALITIES) if rng.random() < 0.9 else None,
+            "created_at": created,
+            "updated_at": created,
+            "author_hash": f"{rng.getrandbits(256):064x}",
+            "like_count": 0,
+            "status": "blocked" if rng.random() < 0.02 else "active",
+        }
+
+
+async def seed(posts: int, likes: int, days: int, seed_value: int, reset: bool):
+    rng = random.Random(seed_value)
+    engine = get_engine()
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        if reset:
+            await conn.execute(text("TRUNCATE likes, posts, images"))
+
+    start = time.perf_counter()
+    image_rows = []
+    post_rows = list(make_posts(rng, posts, days, image_rows))
+
+    # Long-tail popularity: a few posts collect most of the likes,
+    # and visitors like several posts each
+    weights = [1 / (rank + 1) ** 1.1 for rank in range(len(post_rows))]
+    rng.shuffle(weights)
+    cum_weights = list(accumulate(weights))
+    visitors = [f"{rng.getrandbits(256):064x}" for _ in range(max(1, likes // 8))]
+    likes = min(likes, len(post_rows) * len(visitors))
+
+    like_rows = {}
+    attempts = 0
+    while len(like_rows) < likes and attempts < likes * 20:
+        needed = likes - len(like_rows)
+        attempts += needed
+        for post in rng.choices(post_rows, cum_weights=cum_weights, k=needed):
+            client_hash = rng.choice(visitors)
+            key = (post["id"], client_hash)
+            if key in like_rows:
+                continue
+            like_rows[key] = {
+                "post_id": post["id"],
+                "client_hash": client_hash,
+                "created_at": post["created_at"] + timedelta(seconds=rng.uniform(0, 3 * 86400)),
+            }
+            post["like_count"] += 1
+
+    for post in post_rows:
+        post["hot_score"] = hot_score(post["like_count"], post["created_at"])
+
+    async with engine.begin() as conn:
+        for i in range(0, len(image_rows), BATCH_SIZE):
+            await conn.execute(insert(Image.__table__), image_rows[i:i + BATCH_SIZE])
+        for i in range(0, len(post_rows), BATCH_SIZE):
+            await conn.execute(insert(Post.__table__), post_rows[i:i + BATCH_SIZE])
+        like_list = list(like_rows.values())
+        for i in range(0, len(like_list), BATCH_SIZE * 10):
+            await conn.execute(insert(Like.__table__), like_list[i:i + BATCH_SIZE * 10])
+        await rebuild_facets(conn)
+        await conn.execute(text("ANALYZE images"))
+        await conn.execute(text("ANALYZE posts"))
+        await conn.execute(text("ANALYZE likes"))
+
+    elapsed = time.perf_counter() - start
+    print(f"✓ Seeded {len(post_rows)} posts, {len(image_rows)} images and {len(like_rows)} likes in {elapsed:.1f}s (seed={seed_value})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--likes", type=int, default=50000)
+    parser.add_argument("--days", type=int, default=30, help="spread created_at over this many days")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--reset", action="store_true", help="TRUNCATE posts, likes and images first")
+    parser.add_argument("--yes", action="store_true", help="allow a non-local database")
+    args = parser.parse_args()
+
+    from app.database import db_url
+    if db_url.host not in LOCAL_HOSTS and not args.yes:
+        parser.error(f"refusing to seed non-local database host {db_url.host!r} without --yes")
+
+    asyncio.run(seed(args.posts, args.likes, args.days, args.seed, args.reset))
+
+
+if __name__ == "__main__":
+    main()
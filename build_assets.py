@@ -0,0 +1,75 @@
+"""
+Build fingerprinted, precompressed copies of everything under static/.
+
+    static/css/styles.css -> static/dist/css/styles.<hash>.css (+ .gz, .br)
+
+and write static/dist/manifest.json mapping source paths to the built files,
+which app/static_assets.asset_url() reads at startup. Also compiles the
+templates into the Jinja bytecode cache (app/startup.py), so the first
+request after a cold start doesn't compile them. Run as part of deploy:
+
+    python build_assets.py
+"""
+import gzip
+import hashlib
+import json
+import shutil
+from pathlib import Path
+from app.static_assets import STATIC_DIR, DIST_DIRNAME, MANIFEST_NAME
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip copies are always written
+    brotli = None
+
+# Images are already compressed; only text assets get .gz/.br siblings
+COMPRESSIBLE_SUFFIXES = {".css", ".js", ".svg", ".json", ".txt", ".html", ".xml"}
+# Filenames crawlers and other sites link to directly keep their plain URL
+UNFINGERPRINTED = {"og-preview.png"}
+HASH_LENGTH = 10
+
+
+def build(static_dir: Path = STATIC_DIR) -> dict:
+    dist_dir = static_dir / DIST_DIRNAME
+    if dist_dir.exists():
+        shutil.rmtree(dist_dir)
+    dist_dir.mkdir(parents=True)
+
+    manifest = {}
+    for source in sorted(static_dir.rglob("*")):
+        if not source.is_file() or dist_dir in source.parents or source.name in UNFINGERPRINTED:
+            continue
+
+        data = source.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+        relative = source.relative_to(static_dir)
+        built = relative.with_name(f"{source.stem}.{digest}{source.suffix}")
+        target = dist_dir / built
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+
+        sizes = [f"{len(data)}B"]
+        if source.suffix.lower() in COMPRESSIBLE_SUFFIXES:
+            # mtime=0 keeps the .gz output reproducible between builds
+            gz = gzip.compress(data, compresslevel=9, mtime=0)
+            target.with_name(target.name + ".gz").write_bytes(gz)
+            sizes.append(f"gz {len(gz)}B")
+            if brotli is not None:
+                br = brotli.compress(data, quality=11)
+                target.with_name(target.name + ".br").write_bytes(br)
+                sizes.append(f"br {len(br)}B")
+
+        manifest[relative.as_posix()] = f"{DIST_DIRNAME}/{built.as_posix()}"
+        print(f"✓ {relative.as_posix()} -> {built.as_posix()} ({', '.join(sizes)})")
+
+    with open(dist_dir / MANIFEST_NAME, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    if brotli is None:
+        print("! brotli not installed - wrote gzip copies only")
+    return manifest
+
+
+if __name__ == "__main__":
+    build()
+    from app.startup import TEMPLATE_CACHE_DIR, build_template_cache
+    print(f"✓ {build_template_cache()} templates compiled into {TEMPLATE_CACHE_DIR}")
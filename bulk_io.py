@@ -0,0 +1,272 @@
+"""
+Bulk import/export of posts and likes using Postgres COPY.
+
+Import streams NDJSON or CSV into the table with asyncpg's COPY protocol;
+export streams rows out through COPY TO (CSV) or a server-side cursor
+(NDJSON). Rows are never collected in memory, so millions of rows and their
+image payloads go through in constant memory. A .gz suffix is (de)compressed
+on the fly; "-" means stdin/stdout.
+
+NDJSON columns are taken from the first record, and a field missing from a
+later record is loaded as NULL, so keep records uniform (exports always are).
+
+    python bulk_io.py export posts posts.ndjson.gz
+    python bulk_io.py export likes likes.csv
+    python bulk_io.py import posts posts.ndjson.gz --skip-existing
+    python bulk_io.py import likes likes.csv --skip-existing --recount
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+import asyncpg
+from sqlalchemy import DateTime, Integer
+from app.database import db_url, connect_args
+from app.hot import hot_score_sql
+from app.facets import REBUILD as REBUILD_FACETS
+from app.models import Post, Like, Image
+
+# Import images before the posts that reference them
+TABLES = {"images": Image.__table__, "posts": Post.__table__, "likes": Like.__table__}
+PROGRESS_EVERY = 100_000
+
+
+def log(message: str):
+    # stdout may be carrying the export itself
+    print(message, file=sys.stderr)
+
+
+def detect_format(path: str, explicit: Optional[str]) -> str:
+    if explicit:
+        return explicit
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl", ".json")):
+        return "ndjson"
+    raise SystemExit(f"Can't tell the format of {path!r}; pass --format csv|ndjson")
+
+
+def open_binary(path: str, mode: str):
+    if path == "-":
+        return sys.stdin.buffer if mode == "rb" else sys.stdout.buffer
+    if path.endswith(".gz"):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+async def connect() -> asyncpg.Connection:
+    dsn = db_url.set(drivername="postgresql").render_as_string(hide_password=False)
+    return await asyncpg.connect(dsn, **connect_args)
+
+
+# ==================== EXPORT ====================
+
+def _json_default(value):
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Unserializable {type(value).__name__}")
+
+
+async def export_table(table_name: str, path: str, fmt: str, batch: int):
+    table = TABLES[table_name]
+    columns = [c.name for c in table.columns]
+    conn = await connect()
+    start = time.perf_counter()
+    rows = 0
+    try:
+        with open_binary(path, "wb") as out:
+            if fmt == "csv":
+                status = await conn.copy_from_table(
+                    table_name, columns=columns, output=out, format="csv", header=True
+                )
+                rows = int(status.split()[-1])
+            else:
+                # Cursors only exist inside a transaction; REPEATABLE READ gives
+                # one consistent snapshot for the whole export
+                async with conn.transaction(isolation="repeatable_read", readonly=True):
+                    query = f"SELECT {', '.join(columns)} FROM {table_name}"
+                    async for record in conn.cursor(query, prefetch=batch):
+                        out.write(json.dumps(dict(record), default=_json_default).encode())
+                        out.write(b"\n")
+                        rows += 1
+                        if rows % PROGRESS_EVERY == 0:
+                            log(f"  {rows} rows...")
+    finally:
+        await conn.close()
+    log(f"✓ Exported {rows} {table_name} to {path} in {time.perf_counter() - start:.1f}s")
+
+
+# ==================== IMPORT ====================
+
+def _converters(table, columns: List[str]):
+    """Per-column parsers from JSON values to what binary COPY expects"""
+    converters = []
+    for name in columns:
+        column_type = table.columns[name].type
+        if isinstance(column_type, DateTime):
+            converters.append(lambda v: datetime.fromisoformat(v) if isinstance(v, str) else v)
+        elif isinstance(column_type, Integer):
+            converters.append(lambda v: int(v) if v is not None else None)
+        elif name in ("id", "post_id", "image_id"):
+            converters.append(lambda v: uuid.UUID(v) if isinstance(v, str) else v)
+        else:
+            converters.append(lambda v: v)
+    return converters
+
+
+def read_ndjson_header(stream, table) -> tuple:
+    """Columns come from the first record; returns (columns, first_line)"""
+    first = stream.readline()
+    if not first:
+        return [], None
+    keys = json.loads(first)
+    columns = [name for name in keys if name in table.columns]
+    unknown = set(keys) - set(columns)
+    if unknown:
+        log(f"! ignoring unknown fields: {', '.join(sorted(unknown))}")
+    return columns, first
+
+
+async def ndjson_records(stream, first_line: bytes, columns: List[str], converters) -> AsyncIterator[tuple]:
+    line = first_line
+    count = 0
+    while line:
+        if line.strip():
+            data = json.loads(line)
+            yield tuple(convert(data.get(name)) for name, convert in zip(columns, converters))
+            count += 1
+            if count % PROGRESS_EVERY == 0:
+                log(f"  {count} rows...")
+                # Let the COPY writer drain between chunks
+                await asyncio.sleep(0)
+        line = stream.readline()
+
+
+def read_csv_columns(stream, table) -> List[str]:
+    header = stream.readline().decode().strip()
+    columns = [name.strip().strip('"') for name in header.split(",")]
+    unknown = [name for name in columns if name not in table.columns]
+    if unknown:
+        raise SystemExit(f"Unknown CSV columns for {table.name}: {', '.join(unknown)}")
+    return columns
+
+
+async def import_table(table_name: str, path: str, fmt: str, skip_existing: bool, recount: bool):
+    table = TABLES[table_name]
+    conn = await connect()
+    start = time.perf_counter()
+    try:
+        with open_binary(path, "rb") as stream:
+            if fmt == "csv":
+                columns = read_csv_columns(stream, table)
+                records = None
+            else:
+                columns, first_line = read_ndjson_header(stream, table)
+                if not columns:
+                    log(f"Nothing to import from {path}")
+                    return
+                records = ndjson_records(stream, first_line, columns, _converters(table, columns))
+
+            missing_keys = [c.name for c in table.primary_key.columns if c.name not in columns]
+            if missing_keys:
+                raise SystemExit(f"{table_name} import needs primary key column(s): {', '.join(missing_keys)}")
+
+            async with conn.transaction():
+                target = table_name
+                if skip_existing:
+                    # COPY can't skip conflicts, so load into a staging table first
+                    target = f"_import_{table_name}"
+                    await conn.execute(
+                        f"CREATE TEMP TABLE {target} (LIKE {table_name} INCLUDING DEFAULTS) ON COMMIT DROP"
+                    )
+
+                if records is None:
+                    # CSV is parsed server-side; the header line was already consumed
+                    status = await conn.copy_to_table(target, source=stream, columns=columns, format="csv")
+                else:
+                    status = await conn.copy_records_to_table(target, records=records, columns=columns)
+                loaded = int(status.split()[-1])
+
+                inserted = loaded
+                if skip_existing:
+                    column_list = ", ".join(columns)
+                    where = ""
+                    if table_name == "likes":
+                        # Likes for posts that aren't here would violate the foreign key
+                        where = "WHERE EXISTS (SELECT 1 FROM posts p WHERE p.id = s.post_id)"
+                    status = await conn.execute(
+                        f"INSERT INTO {table_name} ({column_list}) "
+                        f"SELECT {column_list} FROM {target} s {where} ON CONFLICT DO NOTHING"
+                    )
+                    inserted = int(status.split()[-1])
+
+            log(f"✓ Imported {inserted} of {loaded} {table_name} rows from {path} "
+                f"in {time.perf_counter() - start:.1f}s")
+
+        if table_name == "posts":
+            await rebuild_facets(conn)
+        if recount:
+            await recount_likes(conn)
+    finally:
+        await conn.close()
+
+
+async def rebuild_facets(conn: asyncpg.Connection):
+    """COPY skips the app's write paths, so recount facet_counts after a posts import"""
+    async with conn.transaction():
+        await conn.execute("DELETE FROM facet_counts")
+        await conn.execute(REBUILD_FACETS)
+    log("✓ Rebuilt facet counts")
+
+
+async def recount_likes(conn: asyncpg.Connection):
+    """Set posts.like_count (and hot_score) from the likes table after a likes import"""
+    status = await conn.execute(f"""
+        UPDATE posts p SET like_count = c.n, hot_score = {hot_score_sql('c.n', 'p.created_at')}
+        FROM (
+            SELECT p2.id, COUNT(l.post_id) AS n
+            FROM posts p2 LEFT JOIN likes l ON l.post_id = p2.id
+            GROUP BY p2.id
+        ) c
+        WHERE p.id = c.id AND p.like_count IS DISTINCT FROM c.n
+    """)
+    log(f"✓ Recounted likes: {status.split()[-1]} posts corrected")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import/export of posts and likes with COPY")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = sub.add_parser("export", help="stream a table to a file")
+    export_parser.add_argument("table", choices=TABLES)
+    export_parser.add_argument("path", help='output file (.csv, .ndjson, optionally .gz) or "-"')
+    export_parser.add_argument("--format", choices=["csv", "ndjson"])
+    export_parser.add_argument("--batch", type=int, default=200, help="rows fetched per cursor round trip")
+
+    import_parser = sub.add_parser("import", help="stream a file into a table")
+    import_parser.add_argument("table", choices=TABLES)
+    import_parser.add_argument("path", help='input file (.csv, .ndjson, optionally .gz) or "-"')
+    import_parser.add_argument("--format", choices=["csv", "ndjson"])
+    import_parser.add_argument("--skip-existing", action="store_true",
+                               help="skip rows whose key already exists instead of failing")
+    import_parser.add_argument("--recount", action="store_true",
+                               help="recompute posts.like_count from likes afterwards")
+
+    args = parser.parse_args()
+    fmt = detect_format(args.path, args.format)
+    if args.command == "export":
+        asyncio.run(export_table(args.table, args.path, fmt, args.batch))
+    else:
+        asyncio.run(import_table(args.table, args.path, fmt, args.skip_existing, args.recount))
+
+
+if __name__ == "__main__":
+    main()
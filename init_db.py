@@ -1,6 +1,6 @@
 import asyncio
 from app.database import engine, Base
-from app.models import Post, Like  # Import models to register them with Base
+from app.models import Post, Like, Image, RateLimit, FacetCount  # Import models to register them with Base
 
 async def init_models():
     async with engine.begin() as conn:
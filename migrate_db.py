@@ -47,6 +47,102 @@ async def migrate():
             except Exception as e:
                 print(f"! {col_name}: {e}")
         
+        # updated_at drives Last-Modified on public pages
+        try:
+            await conn.execute(text("ALTER TABLE posts ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ"))
+            await conn.execute(text("UPDATE posts SET updated_at = COALESCE(created_at, NOW()) WHERE updated_at IS NULL"))
+            await conn.execute(text("ALTER TABLE posts ALTER COLUMN updated_at SET DEFAULT NOW()"))
+            print("✓ updated_at")
+        except Exception as e:
+            print(f"! updated_at: {e}")
+        
+        # Watermark scans for the like_count reconciler
+        try:
+            await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_likes_created_at ON likes (created_at)"))
+            await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_posts_updated_at ON posts (updated_at)"))
+            print("✓ likes.created_at / posts.updated_at indexes")
+        except Exception as e:
+            print(f"! reconcile indexes: {e}")
+        
+        # Hot tab score
+        try:
+            from app.hot import hot_score_sql
+            await conn.execute(text("ALTER TABLE posts ADD COLUMN IF NOT EXISTS hot_score DOUBLE PRECISION"))
+            await conn.execute(text(f"UPDATE posts SET hot_score = {hot_score_sql()} WHERE hot_score IS NULL"))
+            await conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_posts_hot_score
+                ON posts (hot_score DESC NULLS LAST) WHERE status = 'active'
+            """))
+            print("✓ hot_score")
+        except Exception as e:
+            print(f"! hot_score: {e}")
+        
+        # Deduplicated uploads, shared between posts
+        try:
+            await conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS images (
+                    id UUID PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    width INTEGER,
+                    height INTEGER,
+                    created_at TIMESTAMPTZ DEFAULT NOW()
+                )
+            """))
+            # A perceptual hash match merged different pictures; dedup is now
+            # by exact pixel digest only, and the hash columns are gone
+            await conn.execute(text("ALTER TABLE images DROP CONSTRAINT IF EXISTS uq_images_fingerprint"))
+            await conn.execute(text("DROP INDEX IF EXISTS ix_images_fingerprint"))
+            await conn.execute(text("ALTER TABLE images DROP COLUMN IF EXISTS phash, DROP COLUMN IF EXISTS color"))
+            await conn.execute(text("ALTER TABLE images ADD COLUMN IF NOT EXISTS digest VARCHAR(64)"))
+            await conn.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS uq_images_digest ON images (digest)"
+            ))
+            await conn.execute(text(
+                "ALTER TABLE posts ADD COLUMN IF NOT EXISTS image_id UUID REFERENCES images(id) ON DELETE SET NULL"
+            ))
+            print("✓ images table / image_id")
+        except Exception as e:
+            print(f"! images: {e}")
+        
+        # Tag / nationality browse pages and their sidebar counts. In a
+        # savepoint, so a failed recount doesn't abort the steps after it
+        savepoint = await conn.begin_nested()
+        try:
+            from app.facets import rebuild_facets
+            await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_posts_tags ON posts USING gin (tags)"))
+            await conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_posts_nationality ON posts (nationality, created_at DESC, id DESC)"
+            ))
+            await conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS facet_counts (
+                    facet VARCHAR(20) NOT NULL,
+                    value VARCHAR NOT NULL,
+                    count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (facet, value)
+                )
+            """))
+            await conn.execute(text("ALTER TABLE facet_counts ALTER COLUMN value TYPE VARCHAR"))
+            await rebuild_facets(conn)
+            await savepoint.commit()
+            print("✓ tag/nationality indexes, facet_counts")
+        except Exception as e:
+            if savepoint.is_active:
+                await savepoint.rollback()
+            print(f"! facets: {e}")
+        
+        # Shared token buckets for RATE_LIMIT_BACKEND=postgres
+        try:
+            await conn.execute(text("""
+                CREATE UNLOGGED TABLE IF NOT EXISTS rate_limits (
+                    key VARCHAR PRIMARY KEY,
+                    tokens DOUBLE PRECISION NOT NULL,
+                    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                )
+            """))
+            print("✓ rate_limits table")
+        except Exception as e:
+            print(f"! rate_limits: {e}")
+        
         # Migrate old content to title
         await conn.execute(text("UPDATE posts SET title = SUBSTRING(content, 1, 50) WHERE title IS NULL AND content IS NOT NULL"))
         
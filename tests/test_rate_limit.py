@@ -0,0 +1,78 @@
+"""
+MemoryBuckets - refill, rejection and LRU expiry.
+Run with: python -m pytest tests
+"""
+import asyncio
+import pytest
+from app import rate_limit
+from app.rate_limit import MemoryBuckets
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock)
+    return clock
+
+
+def acquire(buckets: MemoryBuckets, key: str, capacity: float = 3, rate: float = 1.0):
+    return asyncio.run(buckets.acquire(key, capacity, rate))
+
+
+def test_burst_then_reject(clock):
+    buckets = MemoryBuckets()
+    assert [acquire(buckets, "k") for _ in range(3)] == [None, None, None]
+    assert acquire(buckets, "k") == pytest.approx(1.0)
+
+
+def test_retry_after_shrinks_as_tokens_refill(clock):
+    buckets = MemoryBuckets()
+    for _ in range(3):
+        acquire(buckets, "k", rate=0.5)
+    assert acquire(buckets, "k", rate=0.5) == pytest.approx(2.0)
+    clock.now += 1
+    assert acquire(buckets, "k", rate=0.5) == pytest.approx(1.0)
+    clock.now += 1
+    assert acquire(buckets, "k", rate=0.5) is None
+
+
+def test_refill_is_capped_at_capacity(clock):
+    buckets = MemoryBuckets()
+    acquire(buckets, "k")
+    clock.now += 3600
+    assert [acquire(buckets, "k") for _ in range(3)] == [None, None, None]
+    assert acquire(buckets, "k") is not None
+
+
+def test_keys_are_independent(clock):
+    buckets = MemoryBuckets()
+    for _ in range(3):
+        acquire(buckets, "a")
+    assert acquire(buckets, "a") is not None
+    assert acquire(buckets, "b") is None
+
+
+def test_full_buckets_are_dropped(clock):
+    buckets = MemoryBuckets()
+    acquire(buckets, "a")
+    clock.now += 1
+    # "a" has refilled completely, so it is forgotten on the next call
+    acquire(buckets, "b")
+    assert list(buckets._buckets) == ["b"]
+
+
+def test_max_keys_evicts_least_recently_used(clock):
+    buckets = MemoryBuckets(max_keys=2)
+    for key in ("a", "b", "c"):
+        acquire(buckets, key)
+    assert list(buckets._buckets) == ["b", "c"]
+    # An evicted visitor starts with a full bucket again
+    assert [acquire(buckets, "a") for _ in range(3)] == [None, None, None]